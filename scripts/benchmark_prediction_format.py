@@ -0,0 +1,39 @@
+# 予測フォーマットのparseのベンチマーク
+# usage: python scripts/benchmark_prediction_format.py
+
+import os
+import sys
+import timeit
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.prediction_format import validate_content, normalize_content, parse_content  # noqa: E402
+
+symbol_count = 30
+number = 1000
+content = 'symbol,position\n'.encode() + '\n'.join([
+    'SYM{},{}'.format(i, (-1) ** i * 0.5 / symbol_count)
+    for i in range(symbol_count)
+]).encode()
+
+
+def run():
+    validate_content(content)
+    normalize_content(content)
+    parse_content(content)
+
+
+def main():
+    fast_sec = timeit.timeit(run, number=number)
+    with patch('src.prediction_format._parse_content_fast', return_value=None):
+        pandas_sec = timeit.timeit(run, number=number)
+
+    print('symbols {} iterations {}'.format(symbol_count, number))
+    print('pandas {:.3f} ms/content'.format(1000 * pandas_sec / number))
+    print('fast   {:.3f} ms/content'.format(1000 * fast_sec / number))
+    print('speedup {:.1f}x'.format(pandas_sec / fast_sec))
+
+
+if __name__ == '__main__':
+    main()
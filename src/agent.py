@@ -30,6 +30,15 @@ class Agent:
         chain_id = network_name_to_chain_id(network_name)
         start_block_number = int(os.getenv('ALPHASEA_START_BLOCK_NUMBER', '1'))
         max_priority_fee_scale = float(os.getenv('ALPHASEA_MAX_PRIORITY_FEE_SCALE', '1'))
+        snapshot_interval_sec = int(os.getenv('ALPHASEA_EVENT_INDEXER_SNAPSHOT_INTERVAL_SEC', '60'))
+        backfill_concurrency = int(os.getenv('ALPHASEA_EVENT_INDEXER_BACKFILL_CONCURRENCY', '1'))
+        rpc_rate_limit = int(os.getenv('ALPHASEA_RPC_RATE_LIMIT', '1'))
+        confirmation_blocks = int(os.getenv('ALPHASEA_CONFIRMATION_BLOCKS', '0'))
+        event_indexer_poll_interval_sec = float(os.getenv('ALPHASEA_EVENT_INDEXER_POLL_INTERVAL_SEC', '15'))
+        content_cache_size = int(os.getenv('ALPHASEA_CONTENT_CACHE_SIZE', '100000'))
+        content_cache_redis = os.getenv('ALPHASEA_CONTENT_CACHE_REDIS', '0') == '1'
+        decrypt_concurrency = int(os.getenv('ALPHASEA_DECRYPT_CONCURRENCY', '1'))
+        gas_budget = int(os.getenv('ALPHASEA_TX_GAS_BUDGET', '10000000'))
         tournament_id = 'crypto_daily'
 
         logger.debug('executor_evaluation_periods {}'.format(executor_evaluation_periods))
@@ -39,6 +48,15 @@ class Agent:
         logger.debug('chain_id {}'.format(chain_id))
         logger.debug('start_block_number {}'.format(start_block_number))
         logger.debug('max_priority_fee_scale {}'.format(max_priority_fee_scale))
+        logger.debug('snapshot_interval_sec {}'.format(snapshot_interval_sec))
+        logger.debug('backfill_concurrency {}'.format(backfill_concurrency))
+        logger.debug('rpc_rate_limit {}'.format(rpc_rate_limit))
+        logger.debug('confirmation_blocks {}'.format(confirmation_blocks))
+        logger.debug('event_indexer_poll_interval_sec {}'.format(event_indexer_poll_interval_sec))
+        logger.debug('content_cache_size {}'.format(content_cache_size))
+        logger.debug('content_cache_redis {}'.format(content_cache_redis))
+        logger.debug('decrypt_concurrency {}'.format(decrypt_concurrency))
+        logger.debug('gas_budget {}'.format(gas_budget))
         logger.debug('tournament_id {}'.format(tournament_id))
 
         rate_limiter = RateLimiterGroup(
@@ -46,7 +64,7 @@ class Agent:
                 {
                     'tag': 'default',
                     'period_sec': 1,
-                    'count': 1,
+                    'count': rpc_rate_limit,
                 }
             ]
         )
@@ -63,6 +81,14 @@ class Agent:
                 namespace='store:{}:'.format(contract.address)
             ),
             max_priority_fee_scale=max_priority_fee_scale,
+            snapshot_interval_sec=snapshot_interval_sec,
+            backfill_concurrency=backfill_concurrency,
+            confirmation_blocks=confirmation_blocks,
+            poll_interval_sec=event_indexer_poll_interval_sec,
+            content_cache_size=content_cache_size,
+            content_cache_redis=content_cache_redis,
+            decrypt_concurrency=decrypt_concurrency,
+            gas_budget=gas_budget,
         )
 
         data_fetcher_builder = DataFetcherBuilder()
@@ -119,9 +145,11 @@ class Agent:
             predictor=predictor,
         )
 
+        self.store = store
         self.tournaments = tournaments
 
     def initialize(self):
+        self.store.start_thread()
         tournaments = self.tournaments
         for tournament_id in tournaments:
             tournaments[tournament_id].executor.start_thread()
@@ -132,3 +160,4 @@ class Agent:
         for tournament_id in tournaments:
             tournaments[tournament_id].executor.terminate_thread()
             tournaments[tournament_id].predictor.terminate_thread()
+        self.store.terminate_thread()
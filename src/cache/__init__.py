@@ -0,0 +1,70 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+# thread safeなLRUキャッシュ
+# maxsizeを超えたら最も長く使われていないものから捨てる
+
+class LruCache:
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# thread safeなTTLキャッシュ
+# expire_at(unix time)を過ぎたものは返さない
+
+class TtlCache:
+    def __init__(self, time_func=None):
+        self._time_func = time.time if time_func is None else time_func
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expire_at = item
+            if self._time_func() >= expire_at:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, expire_at):
+        with self._lock:
+            now = self._time_func()
+            for k in [k for k, (_, x) in self._data.items() if now >= x]:
+                del self._data[k]
+            if now < expire_at:
+                self._data[key] = (value, expire_at)
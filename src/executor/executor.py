@@ -2,15 +2,18 @@ import time
 import threading
 import traceback
 import numpy as np
-from ..logger import create_null_logger
+import pandas as pd
+from ..logger import create_null_logger, check_futures
 from .utils import (
-    fetch_historical_predictions,
     fetch_current_predictions,
-    blend_predictions,
+    fetch_current_predictions_range,
+    blend_prediction_vector,
     floor_to_execution_start_at,
-    calc_target_positions,
-    create_model_selection_params
+    calc_target_position_vectors,
+    create_model_selection_params_from_panel,
 )
+from .model_selection_panel import ModelSelectionPanel
+from .symbol_universe import SymbolUniverse
 
 day_seconds = 24 * 60 * 60
 
@@ -28,11 +31,28 @@ class Executor:
         self._redis_client = redis_client
         self._prediction_sent = set()
         self._calc_weight_cache = {}
+        self._futures = []
+        # execution_start_at -> (signature, (position vector, mask) or None)
+        self._blended_cache = {}
+        # execution_start_at -> surface (get_target_positionsはtの補間だけにする)
+        self._target_position_surfaces = {}
+        self._target_position_lock = threading.Lock()
 
         self._evaluation_periods = evaluation_periods
         self._model_selector = model_selector
         self._market_data_store = market_data_store
         self._symbol_white_list = symbol_white_list.copy()
+        # 予測はこの列順のfloat配列で扱い、DataFrameにするのはAPIの返り値だけ
+        # white list以外のsymbolも列になるので、上限を超えたら使われていない列を詰める
+        self._symbol_universe = SymbolUniverse(self._symbol_white_list)
+        self._max_symbol_count = 1000
+        self._model_selection_panel = ModelSelectionPanel(
+            store=store,
+            tournament_id=tournament_id,
+            market_data_store=market_data_store,
+            symbols=self._symbol_white_list,
+            logger=self._logger,
+        )
         self._thread = None
         self._thread_terminated = False
         self._initialized = False
@@ -50,34 +70,96 @@ class Executor:
         execution_start_at, t = floor_to_execution_start_at(timestamp, self._tournament)
         execution_time = self._tournament['execution_time']
 
-        df_blended_list = []
         round_count = day_seconds // execution_time
-        for i in range(round_count + 1):
-            df_blended_list.append(self._get_blended_prediction(
-                execution_start_at=execution_start_at - execution_time * i,
-                without_fetch_events=i > 0,
-            ))
-        df_blended_list = list(reversed(df_blended_list))
-
-        return calc_target_positions(
-            t,
-            df_blended_list,
+        execution_start_ats = [
+            execution_start_at - execution_time * i
+            for i in reversed(range(round_count + 1))
+        ]
+        df_weights = [self._calc_weight(x) for x in execution_start_ats]
+
+        # 同期はlockの外で行う
+        revision = self._store.fetch_event_revision()
+
+        # イベントもweightも変わっていなければ、前回作ったsurfaceをtで補間するだけ
+        with self._target_position_lock:
+            surface = self._target_position_surfaces.get(execution_start_at)
+            if surface is None or not _is_same_surface_key(surface, revision, df_weights):
+                surface = self._create_target_position_surface(
+                    execution_start_ats, df_weights, revision)
+                self._target_position_surfaces = {execution_start_at: surface}
+
+        return pd.DataFrame(
+            {'position': t * surface['target'] + (1 - t) * surface['target_prev']},
+            index=surface['symbols'],
         )
 
-    def _get_blended_prediction(self, execution_start_at: int, without_fetch_events=False):
-        df_weight = self._calc_weight(execution_start_at)
-
-        df_current = fetch_current_predictions(
+    def _create_target_position_surface(self, execution_start_ats, df_weights, revision):
+        df_currents = fetch_current_predictions_range(
             store=self._store,
             tournament_id=self._tournament_id,
-            execution_start_at=execution_start_at,
-            without_fetch_events=without_fetch_events,
+            execution_start_ats=execution_start_ats,
+            without_fetch_events=True,
         )
 
-        return blend_predictions(
-            df_current=df_current,
-            df_weight=df_weight,
-        )
+        # 中身とweightが変わったラウンドだけblendし直す
+        blended_cache = {}
+        for x, df_weight in zip(execution_start_ats, df_weights):
+            signature = _blend_signature(df_weight, df_currents[x])
+            cached = self._blended_cache.get(x)
+            if cached is not None and cached[0] == signature:
+                blended = cached[1]
+            else:
+                blended = blend_prediction_vector(
+                    df_current=df_currents[x],
+                    df_weight=df_weight,
+                    symbol_universe=self._symbol_universe,
+                    logger=self._logger,
+                )
+            blended_cache[x] = (signature, blended)
+        self._blended_cache = blended_cache
+
+        if len(self._symbol_universe) > self._max_symbol_count:
+            self._compact_symbol_universe()
+        blended_list = [self._blended_cache[x][1] for x in execution_start_ats]
+
+        target, target_prev, mask = calc_target_position_vectors(
+            blended_list, len(self._symbol_universe))
+        df_target = self._symbol_universe.to_df(target, mask)
+        return {
+            'revision': revision,
+            'df_weights': df_weights,
+            'symbols': df_target.index,
+            'target': df_target['position'].values,
+            'target_prev': self._symbol_universe.to_df(target_prev, mask)['position'].values,
+        }
+
+    # white listとキャッシュ中のラウンドで使われているsymbolだけの列に作り直す
+    def _compact_symbol_universe(self):
+        old_symbols = self._symbol_universe.symbols()
+        used_symbols = set()
+        for _, blended in self._blended_cache.values():
+            if blended is not None:
+                used_symbols.update(old_symbols[i] for i in np.flatnonzero(blended[1]))
+        symbol_universe = SymbolUniverse(
+            self._symbol_white_list + sorted(used_symbols - set(self._symbol_white_list)))
+
+        blended_cache = {}
+        for x, (signature, blended) in self._blended_cache.items():
+            if blended is not None:
+                positions, mask = blended
+                old_idx = np.flatnonzero(mask)
+                new_idx = symbol_universe.indices([old_symbols[i] for i in old_idx])
+                new_positions = np.zeros(len(symbol_universe))
+                new_positions[new_idx] = positions[old_idx]
+                new_mask = np.zeros(len(symbol_universe), dtype=bool)
+                new_mask[new_idx] = True
+                blended = (new_positions, new_mask)
+            blended_cache[x] = (signature, blended)
+
+        self._logger.info('Executor._compact_symbol_universe {} -> {}'.format(
+            len(old_symbols), len(symbol_universe)))
+        self._symbol_universe = symbol_universe
+        self._blended_cache = blended_cache
 
     def _run(self):
         while not self._thread_terminated:
@@ -97,12 +179,8 @@ class Executor:
             - day_seconds * np.arange(2, 2 + self._evaluation_periods)
         )
 
-        df = fetch_historical_predictions(
-            store=self._store,
-            tournament_id=self._tournament_id,
-            execution_start_ats=execution_start_ats,
-            logger=self._logger,
-        )
+        # 過去成績は新しいラウンドだけ取得する
+        df_ret, df_position = self._model_selection_panel.fetch(execution_start_ats)
 
         df_current = fetch_current_predictions(
             store=self._store,
@@ -110,20 +188,13 @@ class Executor:
             execution_start_at=execution_start_at,
         )
 
-        df_market = self._market_data_store.fetch_df_market(
-            symbols=self._symbol_white_list,
-        )
-
         if model_ids is not None:
-            df = df.loc[df.index.get_level_values('model_id').isin(model_ids)]
             df_current = df_current.loc[df_current.index.get_level_values('model_id').isin(model_ids)]
 
-        params = create_model_selection_params(
-            df=df,
+        params = create_model_selection_params_from_panel(
+            df_ret=df_ret,
+            df_position=df_position,
             df_current=df_current,
-            df_market=df_market,
-            execution_start_ats=execution_start_ats,
-            symbols=self._symbol_white_list
         )
 
         return params
@@ -140,11 +211,12 @@ class Executor:
 
         self._prediction_sent.add(execution_start_at)
 
-        self._store.send_prediction_keys(
+        # 確定はバックグラウンドで待つ
+        self._futures.append(self._store.send_prediction_keys_async(
             tournament_id=self._tournament_id,
             execution_start_at=execution_start_at,
             receivers=receivers
-        )
+        ))
 
     def _calc_weight(self, execution_start_at):
         if execution_start_at in self._calc_weight_cache:
@@ -182,6 +254,8 @@ class Executor:
         return df_weight
 
     def _step(self):
+        self._futures = check_futures(self._futures, self._logger)
+
         now = int(self._time_func())
 
         t = self._tournament
@@ -202,5 +276,23 @@ class Executor:
         )
 
 
+def _is_same_surface_key(surface, revision, df_weights):
+    # _calc_weightの結果はキャッシュされるので、同じweightなら同じobject
+    return surface['revision'] == revision and all(
+        a is b for a, b in zip(surface['df_weights'], df_weights)
+    )
+
+
+def _blend_signature(df_weight, df_current):
+    if df_weight is None:
+        return None
+    contents = df_current['content'].reindex(df_weight.index)
+    return (
+        tuple(df_weight.index),
+        tuple(df_weight['weight']),
+        tuple(None if pd.isna(x) else x for x in contents),
+    )
+
+
 def _purchase_info_key(execution_start_at):
     return 'purchase_info:{}'.format(execution_start_at)
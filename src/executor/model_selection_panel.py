@@ -0,0 +1,103 @@
+import threading
+import pandas as pd
+from ..logger import create_null_logger
+from .utils import _historical_predictions_to_df, create_model_selection_panel
+
+
+# モデル選択用の過去成績(df_ret, df_position)をラウンドごとに保持する
+# 評価に使うラウンド(2日以上前)の予測とリターンは確定しているので、
+# 窓がずれたときは新しいラウンドだけ取得して追加し、古いラウンドを捨てる
+# リターンが欠けているラウンドは未確定として次回取り直す
+# 復号できない予測があったラウンドは、鍵が後から届くことがあるのでイベントが更新されたら取り直す
+# thread safe
+
+class ModelSelectionPanel:
+    def __init__(self, store, tournament_id, market_data_store, symbols, logger=None):
+        self._store = store
+        self._tournament_id = tournament_id
+        self._market_data_store = market_data_store
+        self._symbols = list(symbols)
+        self._logger = create_null_logger() if logger is None else logger
+        self._df_ret = None
+        self._df_position = None
+        # execution_start_at -> 取得時のイベントのrevision
+        self._incomplete_rounds = {}
+        self._lock = threading.Lock()
+
+    # execution_start_atsの(df_ret, df_position)を返す (create_model_selection_paramsと同じ形式)
+    def fetch(self, execution_start_ats):
+        execution_start_ats = list(execution_start_ats)
+        revision = self._store.fetch_event_revision()
+
+        with self._lock:
+            stale = [
+                x for x, incomplete_revision in self._incomplete_rounds.items()
+                if incomplete_revision != revision
+            ]
+            if self._df_position is None:
+                df_ret, df_position = self._fetch_rounds(execution_start_ats, revision)
+            else:
+                df_ret, df_position = self._update(execution_start_ats, stale, revision)
+            self._incomplete_rounds = {
+                x: incomplete_revision
+                for x, incomplete_revision in self._incomplete_rounds.items()
+                if x in execution_start_ats
+            }
+
+            # リターンが欠けているラウンドはキャッシュしない
+            final = ~(df_position.notna() & df_ret.isna()).any(axis=1)
+            self._df_ret = df_ret.loc[final]
+            self._df_position = df_position.loc[final]
+
+            self._logger.debug('ModelSelectionPanel.fetch rounds {} cached {}'.format(
+                len(execution_start_ats), int(final.sum())))
+
+        return df_ret.copy(), df_position.copy()
+
+    def _update(self, execution_start_ats, stale, revision):
+        kept = self._df_position.index.isin(execution_start_ats) & ~self._df_position.index.isin(stale)
+        df_ret = self._df_ret.loc[kept]
+        df_position = self._df_position.loc[kept]
+
+        missing = [x for x in execution_start_ats if x not in df_position.index]
+        if len(missing) > 0:
+            df_ret_new, df_position_new = self._fetch_rounds(missing, revision)
+            df_ret = _concat_rows(df_ret, df_ret_new)
+            df_position = _concat_rows(df_position, df_position_new)
+
+        # 捨てたラウンドにしか無かった(model_id, symbol)の列は落とす
+        columns = df_position.notna().any(axis=0)
+        df_ret = df_ret.loc[:, columns].reindex(execution_start_ats).sort_index(axis=1)
+        df_position = df_position.loc[:, columns].reindex(execution_start_ats).sort_index(axis=1)
+        return df_ret, df_position
+
+    def _fetch_rounds(self, execution_start_ats, revision):
+        predictions = self._store.fetch_predictions_range(
+            tournament_id=self._tournament_id,
+            execution_start_ats=execution_start_ats,
+        )
+        incomplete = predictions.loc[predictions['content'].isna(), 'execution_start_at'].unique()
+        for x in execution_start_ats:
+            if x in incomplete:
+                self._incomplete_rounds[x] = revision
+            else:
+                self._incomplete_rounds.pop(x, None)
+
+        df = _historical_predictions_to_df(predictions, self._logger)
+        df_market = self._market_data_store.fetch_df_market(
+            symbols=self._symbols,
+        )
+        return create_model_selection_panel(
+            df=df,
+            df_market=df_market,
+            execution_start_ats=execution_start_ats,
+            symbols=self._symbols,
+        )
+
+
+def _concat_rows(df, df_new):
+    if df.shape[1] == 0:
+        return df_new.reindex(df.index.append(df_new.index))
+    if df_new.shape[1] == 0:
+        return df.reindex(df.index.append(df_new.index))
+    return pd.concat([df, df_new])
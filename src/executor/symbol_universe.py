@@ -0,0 +1,45 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+# symbol -> 列番号の対応
+# 予測をsymbolごとのDataFrameではなく、この列順のfloat配列で扱うために使う
+# 新しいsymbolは末尾に追加するので、既存の列番号は変わらない (古い配列は末尾を0で埋めればよい)
+# thread safe
+
+class SymbolUniverse:
+    def __init__(self, symbols=None):
+        self._symbols = []
+        self._indices = {}
+        self._lock = threading.Lock()
+        self.indices(symbols or [])
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def indices(self, symbols):
+        with self._lock:
+            result = np.empty(len(symbols), dtype=np.int64)
+            for i, symbol in enumerate(symbols):
+                idx = self._indices.get(symbol)
+                if idx is None:
+                    idx = len(self._symbols)
+                    self._indices[symbol] = idx
+                    self._symbols.append(symbol)
+                result[i] = idx
+            return result
+
+    def symbols(self):
+        with self._lock:
+            return list(self._symbols)
+
+    # maskがTrueの列だけを、symbol順のDataFrameにする
+    def to_df(self, positions, mask):
+        symbols = self.symbols()
+        idx = np.flatnonzero(mask)
+        idx = idx[np.argsort([symbols[i] for i in idx], kind='stable')]
+        return pd.DataFrame(
+            {'position': np.asarray(positions, dtype=float)[idx]},
+            index=pd.Index([symbols[i] for i in idx], name='symbol', dtype=object),
+        )
@@ -1,21 +1,46 @@
 import traceback
+import numpy as np
 import pandas as pd
-from ..prediction_format import validate_content, parse_content
+from ..logger import create_null_logger
+from ..prediction_format import validate_and_parse_content
+from .symbol_universe import SymbolUniverse
 from ..model_selection.model_selection_params import ModelSelectionParams
 
 day_seconds = 24 * 60 * 60
 
 
+# create_model_selection_panelとcreate_model_selection_params_from_panelをまとめて行う
 def create_model_selection_params(
         df, df_current, df_market, execution_start_ats, symbols):
-    df = df.join(df_market, on=['execution_start_at', 'symbol'], how='left')
+    df_ret, df_position = create_model_selection_panel(
+        df=df,
+        df_market=df_market,
+        execution_start_ats=execution_start_ats,
+        symbols=symbols,
+    )
+    return create_model_selection_params_from_panel(
+        df_ret=df_ret,
+        df_position=df_position,
+        df_current=df_current,
+    )
+
 
-    df = df.loc[df.index.get_level_values('model_id').isin(df_current.index)]
+# 過去の予測(long format)とリターンから(df_ret, df_position)を作る
+def create_model_selection_panel(df, df_market, execution_start_ats, symbols):
+    df = df.join(df_market, on=['execution_start_at', 'symbol'], how='left')
     df = df.loc[df.index.get_level_values('symbol').isin(symbols)]
+    return (
+        _pivot_df(df, execution_start_ats, 'ret'),
+        _pivot_df(df, execution_start_ats, 'position'),
+    )
 
+
+# ModelSelectionPanelの(df_ret, df_position)から、df_currentのモデルだけを使う
+def create_model_selection_params_from_panel(df_ret, df_position, df_current):
+    columns = df_ret.columns.get_level_values('model_id').isin(df_current.index)
     params = ModelSelectionParams(
-        df_ret=_pivot_df(df, execution_start_ats, 'ret'),
-        df_position=_pivot_df(df, execution_start_ats, 'position'),
+        df_ret=df_ret.loc[:, columns],
+        df_position=df_position.loc[:, columns],
         df_current=df_current.copy(),
     )
     params.validate()
@@ -34,16 +59,42 @@ def _pivot_df(df, execution_start_ats, values):
 
 
 # df_blended_listの順番は過去から最近
+# calc_target_position_vectorsのDataFrame版
 def calc_target_positions(t, df_blended_list):
-    df_target = pd.concat(df_blended_list[1:]).groupby('symbol').sum() / (len(df_blended_list) - 1)
-    df_target_prev = pd.concat(df_blended_list[:-1]).groupby('symbol').sum() / (len(df_blended_list) - 1)
+    symbol_universe = SymbolUniverse()
+    indices = [symbol_universe.indices(df.index) for df in df_blended_list]
 
-    df_target['position'] *= t
-    df_target_prev['position'] *= 1 - t
+    blended_list = []
+    for df, idx in zip(df_blended_list, indices):
+        if df.shape[0] == 0:
+            blended_list.append(None)
+            continue
+        vector = np.zeros(len(symbol_universe))
+        vector[idx] = df['position'].astype(float).values
+        mask = np.zeros(len(symbol_universe), dtype=bool)
+        mask[idx] = True
+        blended_list.append((vector, mask))
+
+    target, target_prev, mask = calc_target_position_vectors(blended_list, len(symbol_universe))
+    return symbol_universe.to_df(t * target + (1 - t) * target_prev, mask)
+
+
+# blended_list: [(position vector, mask) or None] (過去から最近)
+# (target, target_prev, mask)を返す。tでの目標ポジションは t * target + (1 - t) * target_prev
+def calc_target_position_vectors(blended_list, size):
+    vectors = np.zeros((len(blended_list), size))
+    masks = np.zeros((len(blended_list), size), dtype=bool)
+    for i, blended in enumerate(blended_list):
+        if blended is None:
+            continue
+        vector, mask = blended
+        vectors[i, :len(vector)] = vector[:size]
+        masks[i, :len(mask)] = mask[:size]
 
-    df = pd.concat([df_target, df_target_prev]).groupby('symbol').sum()
-    df = df.sort_index()
-    return df
+    count = len(blended_list) - 1
+    target = vectors[1:].sum(axis=0) / count
+    target_prev = vectors[:-1].sum(axis=0) / count
+    return target, target_prev, masks.any(axis=0)
 
 
 def floor_to_execution_start_at(timestamp, tournament):
@@ -61,33 +112,51 @@ def floor_to_execution_start_at(timestamp, tournament):
     return execution_start_at, t
 
 
+# blend_prediction_vectorのDataFrame版
 def blend_predictions(df_weight, df_current, logger=None):
-    empty_result = pd.DataFrame([], columns=['symbol', 'position']).set_index('symbol')
+    symbol_universe = SymbolUniverse()
+    blended = blend_prediction_vector(
+        df_weight=df_weight,
+        df_current=df_current,
+        symbol_universe=symbol_universe,
+        logger=logger,
+    )
+    if blended is None:
+        return pd.DataFrame([], columns=['symbol', 'position']).set_index('symbol')
+    return symbol_universe.to_df(*blended)
+
+
+# 各モデルの予測をsymbol_universeの列順の行にして、weights @ matrixでblendする
+# (position vector, mask)を返す。blendする予測が無ければNone
+def blend_prediction_vector(df_weight, df_current, symbol_universe, logger=None):
+    logger = create_null_logger() if logger is None else logger
 
     if df_weight is None:
-        return empty_result
+        return None
 
-    dfs = []
+    weights = []
+    rows = []
     for model_id in df_weight.index:
         try:
             pred = df_current.loc[model_id]
-            validate_content(pred['content'])
-            df = parse_content(pred['content'])
-            df['position'] *= df_weight.loc[model_id, 'weight']
-            df = df.reset_index()
-            dfs.append(df)
+            df = validate_and_parse_content(pred['content'])
+            rows.append((symbol_universe.indices(df.index), df['position'].values))
+            weights.append(df_weight.loc[model_id, 'weight'])
         except Exception as e:
             logger.error(e)
             logger.error(traceback.format_exc())
 
-    if len(dfs) == 0:
-        return empty_result
+    if len(rows) == 0:
+        return None
 
-    df = pd.concat(dfs)
+    size = len(symbol_universe)
+    matrix = np.zeros((len(rows), size))
+    mask = np.zeros(size, dtype=bool)
+    for i, (idx, positions) in enumerate(rows):
+        matrix[i, idx] = positions
+        mask[idx] = True
 
-    return pd.concat([
-        df.groupby('symbol')['position'].sum()
-    ], axis=1)
+    return np.array(weights, dtype=float) @ matrix, mask
 
 
 def df_weight_to_purchase_params_list(
@@ -117,27 +186,41 @@ def fetch_current_predictions(store, tournament_id, execution_start_at, without_
     return df_current
 
 
+def fetch_current_predictions_range(store, tournament_id, execution_start_ats, without_fetch_events=False):
+    predictions = store.fetch_predictions_range(
+        tournament_id=tournament_id,
+        execution_start_ats=execution_start_ats,
+        without_fetch_events=without_fetch_events,
+    )
+    results = {}
+    for execution_start_at in execution_start_ats:
+        df_current = predictions.loc[
+            predictions['execution_start_at'] == execution_start_at,
+            ['model_id', 'owner', 'content']
+        ].set_index('model_id')
+        results[execution_start_at] = df_current.sort_index()
+    return results
+
+
 def fetch_historical_predictions(
         store, tournament_id,
         execution_start_ats,
         logger):
-    without_fetch_events = False
+    predictions = store.fetch_predictions_range(
+        tournament_id=tournament_id,
+        execution_start_ats=execution_start_ats,
+    )
+    return _historical_predictions_to_df(predictions, logger)
+
 
+def _historical_predictions_to_df(predictions, logger):
     dfs = []
-    for execution_start_at in execution_start_ats:
-        predictions = store.fetch_predictions(
-            tournament_id=tournament_id,
-            execution_start_at=execution_start_at,
-            without_fetch_events=without_fetch_events,
-        )
-        without_fetch_events = True
-
-        for prediction in predictions:
-            try:
-                dfs.append(_prediction_to_df(prediction))
-            except Exception as e:
-                logger.error(e)
-                logger.error(traceback.format_exc())
+    for prediction in predictions[['model_id', 'execution_start_at', 'content']].to_dict('records'):
+        try:
+            dfs.append(_prediction_to_df(prediction))
+        except Exception as e:
+            logger.error(e)
+            logger.error(traceback.format_exc())
 
     if len(dfs) == 0:
         df = pd.DataFrame(
@@ -150,8 +233,7 @@ def fetch_historical_predictions(
 
 
 def _prediction_to_df(prediction):
-    validate_content(prediction['content'])
-    df = parse_content(prediction['content'])
+    df = validate_and_parse_content(prediction['content'])
     df['model_id'] = prediction['model_id']
     df['execution_start_at'] = prediction['execution_start_at']
     df = df.reset_index().set_index(['model_id', 'execution_start_at', 'symbol'])
@@ -43,6 +43,23 @@ def set_log_level_web3(log_level):
     logging.getLogger('web3.providers.HTTPProvider').setLevel(level)
 
 
+# 確定したトランザクションのエラーをログに出し、未確定のfutureを返す
+def check_futures(futures, logger):
+    pending = []
+    for future in futures:
+        if not future.done():
+            pending.append(future)
+            continue
+        e = future.exception()
+        if e is not None:
+            logger.error(e)
+            continue
+        # 一部のバッチだけ失敗した場合
+        for failure in future.result().get('failures', []):
+            logger.error(failure['error'])
+    return pending
+
+
 def create_null_logger():
     return SimpleNamespace(
         debug=_null_logger_func,
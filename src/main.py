@@ -26,6 +26,7 @@ set_log_level_web3(log_level_web3)
 w3 = create_w3(
     network_name=network_name,
     web3_provider_uri=os.getenv('WEB3_PROVIDER_URI'),
+    pool_maxsize=int(os.getenv('ALPHASEA_WEB3_POOL_MAXSIZE', '10')),
 )
 
 if network_name == 'hardhat':
@@ -1,10 +1,26 @@
 from io import StringIO
+import hashlib
 import re
 import numpy as np
 import pandas as pd
+from ..cache import LruCache
 from ..types.exceptions import ValidationError
 
+# contentのhash -> parse済みのDataFrame or ValidationError (プロセス全体で共有)
+_parsed_content_cache = LruCache(maxsize=10000)
+
+_symbol_pattern = re.compile(r'^[a-zA-Z0-9]{1,8}$')
+_position_pattern = re.compile(r'^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$')
+# read_csvがNaNとして扱う値のうち、symbolの正規表現に一致するもの
+_na_symbols = {'NA', 'NULL', 'NaN', 'None', 'nan', 'null'}
+_max_abs_position_sum = 1.00001
+
+
 def parse_content(content):
+    parsed = _parse_content_fast(content)
+    if parsed is not None:
+        return _parsed_to_df(parsed)
+
     csv_str = content.decode('utf-8')
     df = pd.read_csv(StringIO(csv_str), dtype=str)
     df['position'] = df['position'].astype(float)
@@ -14,7 +30,45 @@ def parse_content(content):
     return df
 
 
+# validate_contentとparse_contentをまとめて行い、結果をcontentのhashでキャッシュする
+# 呼び出し側で変更してよいように、DataFrameはコピーを返す
+def validate_and_parse_content(content):
+    if not isinstance(content, bytes):
+        validate_content(content)
+
+    key = hashlib.blake2b(content, digest_size=16).digest()
+    result = _parsed_content_cache.get(key)
+    if result is None:
+        try:
+            parsed = _parse_content_fast(content)
+            if parsed is None:
+                validate_content(content)
+                result = parse_content(content)
+            else:
+                result = _parsed_to_df(parsed)
+        except ValidationError as e:
+            result = e
+        _parsed_content_cache.set(key, result)
+
+    if isinstance(result, ValidationError):
+        raise ValidationError(str(result))
+    return result.copy()
+
+
+# validate_contentとnormalize_contentをまとめて行い、(normalize済みのcontent, parse済みのDataFrame)を返す
+def validate_and_normalize_content(content):
+    parsed = _parse_content_fast(content)
+    if parsed is None:
+        validate_content(content)
+        return normalize_content(content), parse_content(content)
+    return _parsed_to_content(parsed), _parsed_to_df(parsed)
+
+
 def normalize_content(content):
+    parsed = _parse_content_fast(content)
+    if parsed is not None:
+        return _parsed_to_content(parsed)
+
     csv_str = content.decode('utf-8')
     df = pd.read_csv(StringIO(csv_str), dtype=str)
 
@@ -28,6 +82,10 @@ def normalize_content(content):
 
 
 def validate_content(content):
+    if _parse_content_fast(content) is not None:
+        return
+
+    # エラーの内容はpandasの処理で判定する
     try:
         csv_str = content.decode('utf-8')
     except Exception as e:
@@ -63,10 +121,82 @@ def validate_content(content):
 
     if float_position.isin([np.inf, -np.inf]).any():
         raise ValidationError('position contains inf')
-    if float_position.abs().sum() > 1.00001:
+    if float_position.abs().sum() > _max_abs_position_sum:
         raise ValidationError('sum of abs(position) must be in [-1, 1]')
 
 
 def validate_symbol(s: str):
     if not re.match(r'^[a-zA-Z0-9]{1,8}$', s):
         raise ValidationError('invalid symbol')
+
+
+# symbol,positionの単純な形式だけを一回の走査で処理する
+# validate_contentを確実に通るものだけ(symbols, positionの文字列, positionのarray)をsymbol順で返す
+# それ以外(quote, 空行, NaN扱いの値, 境界付近の合計など)はNoneを返し、pandasの処理に任せる
+def _parse_content_fast(content):
+    if not isinstance(content, bytes):
+        return None
+    try:
+        csv_str = content.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    if '"' in csv_str or '\r' in csv_str or csv_str.startswith('\ufeff'):
+        return None
+
+    lines = csv_str.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    if len(lines) < 2:
+        return None
+
+    header = lines[0].split(',')
+    if header == ['symbol', 'position']:
+        symbol_idx = 0
+    elif header == ['position', 'symbol']:
+        symbol_idx = 1
+    else:
+        return None
+
+    rows = []
+    for line in lines[1:]:
+        fields = line.split(',')
+        if len(fields) != 2:
+            return None
+        symbol = fields[symbol_idx]
+        position = fields[1 - symbol_idx]
+        if not _symbol_pattern.match(symbol) or symbol in _na_symbols:
+            return None
+        if not _position_pattern.match(position):
+            return None
+        rows.append((symbol, position))
+
+    rows.sort()
+    symbols = [symbol for symbol, _ in rows]
+    if len(set(symbols)) != len(symbols):
+        return None
+
+    positions = np.array([float(position) for _, position in rows])
+    if not np.isfinite(positions).all():
+        return None
+    # 合計の誤差で判定が変わらないように、境界付近はpandasで判定する
+    if np.abs(positions).sum() > _max_abs_position_sum - 1e-9:
+        return None
+
+    return symbols, [position for _, position in rows], positions
+
+
+def _parsed_to_df(parsed):
+    symbols, _, positions = parsed
+    return pd.DataFrame(
+        {'position': positions},
+        index=pd.Index(symbols, name='symbol'),
+    )
+
+
+def _parsed_to_content(parsed):
+    symbols, position_strs, _ = parsed
+    lines = ['symbol,position'] + [
+        '{},{}'.format(symbol, position)
+        for symbol, position in zip(symbols, position_strs)
+    ]
+    return '\n'.join(lines).encode()
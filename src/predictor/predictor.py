@@ -2,9 +2,9 @@ import time
 from collections import defaultdict
 import threading
 import traceback
-from ..prediction_format import validate_content, normalize_content
+from ..prediction_format import validate_and_normalize_content
 from .model_id import validate_model_id
-from ..logger import create_null_logger
+from ..logger import create_null_logger, check_futures
 
 day_seconds = 24 * 60 * 60
 
@@ -21,6 +21,8 @@ class Predictor:
         self._interval_sec = 15
         self._logger = create_null_logger() if logger is None else logger
 
+        self._futures = []
+
         self._thread = None
         self._thread_terminated = False
 
@@ -46,8 +48,7 @@ class Predictor:
 
         validate_model_id(model_id)
 
-        validate_content(content)
-        content = normalize_content(content)
+        content, _ = validate_and_normalize_content(content)
 
         prediction = {
             'content': content,
@@ -89,16 +90,19 @@ class Predictor:
                     'content': prediction['content'],
                 })
 
-        self._store.create_models_if_not_exist(create_model_params_list)
-        self._store.create_predictions(create_prediction_params_list)
+        # 確定はバックグラウンドで待つ (新しいモデルがある場合はcreate_predictionsがその確定を待つ)
+        self._futures.append(self._store.create_models_if_not_exist_async(create_model_params_list))
+        self._futures.append(self._store.create_predictions_async(create_prediction_params_list))
 
     def _step_publication(self, execution_start_at):
-        self._store.publish_prediction_key(
+        self._futures.append(self._store.publish_prediction_key_async(
             tournament_id=self._tournament_id,
             execution_start_at=execution_start_at
-        )
+        ))
 
     def _step(self):
+        self._futures = check_futures(self._futures, self._logger)
+
         now = int(self._time_func())
 
         t = self._tournament
@@ -0,0 +1,59 @@
+import pickle
+import zlib
+from .utils import convert_keys_to_snake_case
+
+# EventIndexerのredisキャッシュ用のエンコード
+# indexerが使うフィールドだけをpythonの組み込み型で保存する (web3のバージョンに依存しない)
+# blockHashはreorg検出用で、キャッシュ(確定したブロックのみ)には保存しない
+# 形式: [version(1byte)][compression(1byte)][pickleしたtupleのlist]
+
+codec_version = 1
+
+_compression_none = 0
+_compression_zlib = 1
+
+
+def compact_event(event):
+    return {
+        'event': event['event'],
+        'blockNumber': event['blockNumber'],
+        'logIndex': event['logIndex'],
+        'blockHash': bytes(event['blockHash']),
+        'args': {
+            key: bytes(value) if isinstance(value, bytes) else value
+            for key, value in convert_keys_to_snake_case(event['args']).items()
+        },
+    }
+
+
+def encode_events(events, compress=True):
+    rows = [
+        (event['event'], event['blockNumber'], event['logIndex'], tuple(event['args'].items()))
+        for event in events
+    ]
+    body = pickle.dumps(rows, protocol=4)
+    if compress:
+        return bytes([codec_version, _compression_zlib]) + zlib.compress(body)
+    else:
+        return bytes([codec_version, _compression_none]) + body
+
+
+def decode_events(value):
+    if len(value) < 2 or value[0] != codec_version:
+        raise ValueError('unsupported event codec version')
+
+    body = value[2:]
+    if value[1] == _compression_zlib:
+        body = zlib.decompress(body)
+    elif value[1] != _compression_none:
+        raise ValueError('unsupported event codec compression')
+
+    return [
+        {
+            'event': event_name,
+            'blockNumber': block_number,
+            'logIndex': log_index,
+            'args': dict(args),
+        }
+        for event_name, block_number, log_index, args in pickle.loads(body)
+    ]
@@ -1,18 +1,45 @@
-import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pickle
+import re
+import threading
 import time
-from .utils import convert_keys_to_snake_case
+import traceback
+from .event_codec import codec_version, compact_event, encode_events, decode_events
+from .event_table import EventTable
 from ..logger import create_null_logger
 from ..web3 import get_events
 
 
 # thegraphのようなことをする
 # インターフェースはsnakecase
+# テーブルと_last_block_numberはsnapshotとしてredisに定期保存し、再起動時はそこから再開する
+# confirmation_blocksより新しい未確定のブロックの変更はjournalに記録し、reorgのときはそこだけ戻す
+# start_threadするとバックグラウンドで同期し、fetch_*はRPCせずに読むだけになる
+
+_event_tables = {
+    'PublicKeyChanged': 'public_keys',
+    'TournamentCreated': 'tournaments',
+    'ModelCreated': 'models',
+    'PredictionCreated': 'predictions',
+    'PredictionKeyPublished': 'prediction_key_publications',
+    'PredictionKeySent': 'prediction_key_sendings',
+}
+_event_names = list(_event_tables)
+_upsert_event_names = ['PublicKeyChanged']
+
+_snapshot_key = 'event_indexer_snapshot'
+_redis_batch_size = 1000
+_snapshot_version = 2
+
 
 class EventIndexer:
     def __init__(self, w3, contract, logger=None,
                  start_block_number=None, rate_limiter=None,
-                 redis_client=None, get_logs_limit=None):
+                 redis_client=None, get_logs_limit=None,
+                 snapshot_interval_sec=None, max_get_logs_window=None,
+                 backfill_concurrency=None, cache_compression=True,
+                 confirmation_blocks=None, poll_interval_sec=None):
         self._w3 = w3
         self._contract = contract
         self._logger = create_null_logger() if logger is None else logger
@@ -21,233 +48,544 @@ class EventIndexer:
 
         self._last_block_number = 0 if start_block_number is None else start_block_number - 1
         self._get_logs_limit = 1000 if get_logs_limit is None else get_logs_limit
+        # 一回のget_logsで取得するchunk(get_logs_limitブロック)の数
+        self._get_logs_window = 1
+        self._max_get_logs_window = 32 if max_get_logs_window is None else max_get_logs_window
+        self._get_logs_target_event_count = 1000
+        # rate limiterは共有しているので、並列数を増やすときはrate limiterの上限も上げる
+        self._backfill_concurrency = 1 if backfill_concurrency is None else backfill_concurrency
+        self._cache_compression = cache_compression
+        self._start_block_number = start_block_number
+        self._confirmation_blocks = 0 if confirmation_blocks is None else confirmation_blocks
+        self._confirmed_block_number = 0
+        # [(block_number, table_name, 更新前の行 (追加の場合はNone))]
+        self._tail_journal = deque()
+        # 未確定のブロックのhash {block_number: hash}
+        self._tail_block_hashes = {}
+        self._snapshot_interval_sec = 60 if snapshot_interval_sec is None else snapshot_interval_sec
+        self._last_snapshot_at = 0
+
+        # _lockはテーブルの読み書き、_sync_lockはチェーンとの同期を直列化する
+        self._lock = threading.RLock()
+        self._synced = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._poll_interval_sec = 15 if poll_interval_sec is None else poll_interval_sec
+        self._thread = None
+        self._thread_terminated = False
+        # テーブルが変わるたびに増える (読み出し側のキャッシュの無効化用)
+        self._revision = 0
+
+        self._tournaments = EventTable(
+            columns=[
+                'tournament_id',
+                'description',
+                'execution_preparation_time',
+                'execution_start_at',
+                'execution_time',
+                'prediction_time',
+                'publication_time',
+                'sending_time',
+            ],
+            unique_keys=['tournament_id'],
+            index_columns=['tournament_id'],
+        )
 
-        # pandasの仕様
-        # ここで追加したカラムはappendで整数を追加したときにobjectになる
-        # 追加しないとfloatになる
-
-        self._tournaments = pd.DataFrame(columns=[
-            'tournament_id',
-            'description',
-            'execution_preparation_time',
-            'execution_start_at',
-            'execution_time',
-            'prediction_time',
-            'publication_time',
-            'sending_time',
-        ])
-
-        self._public_keys = pd.DataFrame(
-            columns=['owner', 'public_key']
+        self._public_keys = EventTable(
+            columns=['owner', 'public_key'],
+            unique_keys=['owner'],
+            index_columns=['owner'],
         )
 
-        self._models = pd.DataFrame(
-            columns=['model_id', 'tournament_id', 'owner']
+        self._models = EventTable(
+            columns=['model_id', 'tournament_id', 'owner'],
+            unique_keys=['model_id'],
+            index_columns=['model_id', 'tournament_id', 'owner'],
         )
 
-        self._predictions = pd.DataFrame(
+        self._predictions = EventTable(
             columns=[
                 'model_id', 'execution_start_at',
                 'encrypted_content'
-            ]
+            ],
+            unique_keys=['model_id', 'execution_start_at'],
+            index_columns=['model_id', 'execution_start_at'],
         )
 
-        self._prediction_key_publications = pd.DataFrame(
+        self._prediction_key_publications = EventTable(
             columns=[
                 'owner', 'tournament_id',
                 'execution_start_at', 'content_key'
-            ]
+            ],
+            unique_keys=['owner', 'tournament_id', 'execution_start_at'],
+            index_columns=['owner', 'tournament_id', 'execution_start_at'],
         )
 
-        self._prediction_key_sendings = pd.DataFrame(
+        self._prediction_key_sendings = EventTable(
             columns=[
                 'owner', 'tournament_id',
                 'execution_start_at', 'receiver',
                 'encrypted_content_key'
-            ]
+            ],
+            unique_keys=['owner', 'tournament_id', 'execution_start_at', 'receiver'],
+            index_columns=['owner', 'tournament_id', 'execution_start_at', 'receiver'],
         )
 
-    def fetch_public_keys(self, owner: str = None, without_fetch_events: bool=False):
-        if not without_fetch_events:
-            self._fetch_events()
+        self._tables_by_name = {
+            'tournaments': self._tournaments,
+            'public_keys': self._public_keys,
+            'models': self._models,
+            'predictions': self._predictions,
+            'prediction_key_publications': self._prediction_key_publications,
+            'prediction_key_sendings': self._prediction_key_sendings,
+        }
 
-        return _filter_df(self._public_keys, [
-            ('owner', owner)
-        ])
+        self._load_snapshot()
 
+    def fetch_public_keys(self, owner: str = None, without_fetch_events: bool = False,
+                          copy: bool = True):
+        return self._fetch(self._public_keys, without_fetch_events, [
+            ('owner', owner)
+        ], copy=copy)
 
-    def fetch_tournaments(self, tournament_id: str = None):
-        self._fetch_events()
 
-        return _filter_df(self._tournaments, [
+    def fetch_tournaments(self, tournament_id: str = None, copy: bool = True):
+        return self._fetch(self._tournaments, False, [
             ('tournament_id', tournament_id)
-        ])
+        ], copy=copy)
 
     def fetch_models(self, model_id: str = None, tournament_id: str = None, owner: str = None,
-                     without_fetch_events: bool = False):
-        if not without_fetch_events:
-            self._fetch_events()
-
-        return _filter_df(self._models, [
+                     without_fetch_events: bool = False, copy: bool = True):
+        return self._fetch(self._models, without_fetch_events, [
             ('model_id', model_id),
             ('tournament_id', tournament_id),
             ('owner', owner),
-        ])
+        ], copy=copy)
 
     def fetch_predictions(self, model_id: str = None, execution_start_at: int = None,
-                          without_fetch_events: bool = False):
-        if not without_fetch_events:
-            self._fetch_events()
-
-        return _filter_df(self._predictions, [
+                          without_fetch_events: bool = False, copy: bool = True):
+        return self._fetch(self._predictions, without_fetch_events, [
             ('model_id', model_id),
             ('execution_start_at', execution_start_at),
-        ])
+        ], copy=copy)
 
     def fetch_prediction_key_publications(
             self, owner: str = None,
             tournament_id: str = None,
             execution_start_at: int = None,
-            without_fetch_events: bool = False):
-        if not without_fetch_events:
-            self._fetch_events()
-
-        return _filter_df(self._prediction_key_publications, [
+            without_fetch_events: bool = False,
+            copy: bool = True):
+        return self._fetch(self._prediction_key_publications, without_fetch_events, [
             ('owner', owner),
             ('tournament_id', tournament_id),
             ('execution_start_at', execution_start_at),
-        ])
+        ], copy=copy)
 
     def fetch_prediction_key_sendings(
             self, owner: str = None,
             tournament_id: str = None,
             execution_start_at: int = None,
             receiver: str = None,
-            without_fetch_events: bool = False):
-        if not without_fetch_events:
-            self._fetch_events()
-
-        return _filter_df(self._prediction_key_sendings, [
+            without_fetch_events: bool = False,
+            copy: bool = True):
+        return self._fetch(self._prediction_key_sendings, without_fetch_events, [
             ('owner', owner),
             ('tournament_id', tournament_id),
             ('execution_start_at', execution_start_at),
             ('receiver', receiver),
-        ])
+        ], copy=copy)
 
-    def _rate_limit(self):
-        if self._rate_limiter is not None:
-            self._rate_limiter.rate_limit(tags=['default'])
+    # 同期スレッドが動いているときは、RPCせずに現在のテーブルを返す
+    def _fetch(self, table, without_fetch_events, conditions, copy):
+        if not without_fetch_events:
+            self.sync()
 
-    def _fetch_events(self):
-        self._rate_limit()
-        current_block = self._w3.eth.block_number
-        events = []
+        with self._lock:
+            return table.fetch(conditions, copy=copy)
 
-        to_block = self._last_block_number
-        while to_block < current_block:
-            from_block = _floor_int(to_block + 1, self._get_logs_limit, 1)
-            to_block = min(from_block + self._get_logs_limit - 1, current_block)
+    # unique keyで一行を引く (見つからなければNone)
+    # 同期はしないので、必要なら先にsyncすること
+    def get_model(self, model_id: str):
+        with self._lock:
+            return self._models.get((model_id,))
 
-            events += self._cached_fetch_events(
-                from_block=from_block,
-                to_block=to_block,
-            )
+    def get_prediction_key_publication(self, owner: str, tournament_id: str, execution_start_at: int):
+        with self._lock:
+            return self._prediction_key_publications.get((owner, tournament_id, execution_start_at))
 
-        for event in events:
-            if self._last_block_number < event['blockNumber']:
-                self._process_event(event)
+    def get_prediction_key_sending(self, owner: str, tournament_id: str, execution_start_at: int,
+                                   receiver: str):
+        with self._lock:
+            return self._prediction_key_sendings.get((owner, tournament_id, execution_start_at, receiver))
 
-        self._last_block_number = to_block
-        self._last_fetch_events_at = time.time()
+    # 同期スレッドが無いときだけ、ここでチェーンと同期する
+    def sync(self):
+        if self._thread is None:
+            self._fetch_events()
 
-    def _cached_fetch_events(self, from_block, to_block):
-        cache_enabled = to_block - from_block + 1 == self._get_logs_limit
-        if not cache_enabled:
-            self._rate_limit()
-            self._logger.debug(
-                'EventIndexer._cached_fetch_events from_block {} to_block {} cache disabled'.format(from_block,
-                                                                                                    to_block))
-            return get_events(
-                self._contract,
-                from_block=from_block,
-                to_block=to_block
+    # この中でwithout_fetch_events=Trueでfetchすると、複数のテーブルを同じ時点で読める
+    # 中でsync(without_fetch_events=False)するとデッドロックしうるので、syncは先に行うこと
+    def read_lock(self):
+        return self._lock
+
+    def fetch_revision(self, without_fetch_events: bool = False):
+        if not without_fetch_events:
+            self.sync()
+        with self._lock:
+            return self._revision
+
+    def start_thread(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+
+    def terminate_thread(self):
+        with self._synced:
+            self._thread_terminated = True
+            self._synced.notify_all()
+        self._thread.join()
+        with self._synced:
+            self._thread = None
+            self._thread_terminated = False
+            self._synced.notify_all()
+
+    # block_numberまで同期されるのを待つ
+    # スレッドが無い場合は次のfetch_*で同期されるので何もしない
+    # 待っている間にスレッドが止まったら、同期できたかどうかを返す
+    def wait_for_block(self, block_number, timeout=None):
+        with self._synced:
+            if self._thread is None:
+                return True
+            self._synced.wait_for(
+                lambda: (self._last_block_number >= block_number
+                         or self._thread_terminated or self._thread is None),
+                timeout
             )
+            return self._last_block_number >= block_number
+
+    def _run(self):
+        while not self._thread_terminated:
+            try:
+                self._fetch_events()
+            except Exception as e:
+                self._logger.error(e)
+                self._logger.error(traceback.format_exc())
+            # terminate_threadで起こされる
+            with self._synced:
+                self._synced.wait_for(lambda: self._thread_terminated, self._poll_interval_sec)
 
-        key = 'event_indexer:{}:{}'.format(from_block, to_block)
-        value = self._redis_client.get(key)
-        if value is None:
+    def _rate_limit(self):
+        if self._rate_limiter is not None:
+            self._rate_limiter.rate_limit(tags=['default'])
+
+    # RPCはロックの外で行い、テーブルの更新だけをロックの中でまとめて行う
+    def _fetch_events(self):
+        with self._sync_lock:
             self._rate_limit()
-            self._logger.debug(
-                'EventIndexer._cached_fetch_events from_block {} to_block {} cache miss'.format(from_block, to_block))
-            value = get_events(
+            current_block = self._w3.eth.block_number
+            # ブロックが進んでいなければRPCを使わない (reorgの確認はブロックが進んだときに行う)
+            if current_block <= self._last_block_number:
+                return
+            self._confirmed_block_number = current_block - self._confirmation_blocks
+
+            rollback_block_number = self._find_rollback_block_number()
+            to_block = self._last_block_number
+            if rollback_block_number is not None:
+                to_block = min(to_block, rollback_block_number)
+
+            chunks = []
+            while to_block < current_block:
+                from_block = _floor_int(to_block + 1, self._get_logs_limit, 1)
+                to_block = min(from_block + self._get_logs_limit - 1, current_block)
+                chunks.append((from_block, to_block))
+
+            events = []
+            for chunk_events in self._cached_fetch_chunks(chunks):
+                events += chunk_events
+
+            # to_blockのイベントがあればそのblockHashを使うので取得しない
+            to_block_hash = None
+            if to_block > self._confirmed_block_number and not (
+                    len(events) > 0 and events[-1]['blockNumber'] == to_block) and (
+                    rollback_block_number is not None or to_block not in self._tail_block_hashes):
+                to_block_hash = self._get_block_hash(to_block)
+
+            with self._lock:
+                if rollback_block_number is not None:
+                    self._rollback(rollback_block_number)
+                    self._revision += 1
+
+                for event in events:
+                    if self._last_block_number < event['blockNumber']:
+                        if self._process_event(event):
+                            self._revision += 1
+
+                self._last_block_number = to_block
+                if to_block_hash is not None:
+                    self._tail_block_hashes[to_block] = to_block_hash
+                self._trim_tail()
+                self._synced.notify_all()
+
+            self._last_fetch_events_at = time.time()
+
+            if self._last_fetch_events_at - self._last_snapshot_at >= self._snapshot_interval_sec:
+                self._save_snapshot()
+
+    def _tables(self):
+        return self._tables_by_name
+
+    def _save_snapshot(self):
+        if self._redis_client is None:
+            return
+
+        with self._lock:
+            snapshot = {
+                'version': _snapshot_version,
+                'start_block_number': self._start_block_number,
+                'last_block_number': self._last_block_number,
+                'tables': {name: table.to_snapshot() for name, table in self._tables().items()},
+                'tail_journal': list(self._tail_journal),
+                'tail_block_hashes': self._tail_block_hashes.copy(),
+            }
+        self._redis_client.set(_snapshot_key, pickle.dumps(snapshot))
+        self._last_snapshot_at = time.time()
+        self._logger.debug('EventIndexer._save_snapshot last_block_number {}'.format(self._last_block_number))
+
+    def _load_snapshot(self):
+        if self._redis_client is None:
+            return
+
+        value = self._redis_client.get(_snapshot_key)
+        if value is None:
+            return
+
+        snapshot = pickle.loads(value)
+        if snapshot['version'] != _snapshot_version:
+            self._logger.info('EventIndexer._load_snapshot version mismatch. ignored')
+            return
+        if snapshot['start_block_number'] != self._start_block_number:
+            self._logger.info('EventIndexer._load_snapshot start_block_number mismatch. ignored')
+            return
+
+        for name, table in self._tables().items():
+            table.load_snapshot(snapshot['tables'][name])
+        self._last_block_number = snapshot['last_block_number']
+        self._tail_journal = deque(snapshot['tail_journal'])
+        self._tail_block_hashes = snapshot['tail_block_hashes']
+        self._revision += 1
+        self._last_snapshot_at = time.time()
+        self._logger.debug('EventIndexer._load_snapshot last_block_number {}'.format(self._last_block_number))
+
+    # redisのキャッシュはget_logs_limit単位のalignedなchunkごと
+    # キャッシュに無い連続したchunkはまとめて一回のget_logsで取得する
+    def _cached_fetch_chunks(self, chunks):
+        cacheable_chunks = [chunk for chunk in chunks if self._is_cacheable_chunk(*chunk)]
+        values = {}
+        for i in range(0, len(cacheable_chunks), _redis_batch_size):
+            batch = cacheable_chunks[i:i + _redis_batch_size]
+            values.update(zip(batch, self._redis_client.mget([_chunk_key(*chunk) for chunk in batch])))
+
+        results = []
+        missing = []
+        for from_block, to_block in chunks:
+            value = values.get((from_block, to_block))
+            if value is None:
+                missing.append(len(results))
+                results.append(None)
+            else:
+                self._logger.debug(
+                    'EventIndexer._cached_fetch_chunks from_block {} to_block {} cache hit'.format(
+                        from_block, to_block))
+                results.append(decode_events(value))
+
+        groups = _group_consecutive(missing, lambda: self._get_logs_window)
+        for group, group_results in self._fetch_chunk_groups(chunks, groups):
+            for i, chunk_events in zip(group, group_results):
+                results[i] = chunk_events
+
+        return results
+
+    # backfill_concurrency個までのグループを並列に取得し、groupsの順番で返す
+    def _fetch_chunk_groups(self, chunks, groups):
+        if self._backfill_concurrency <= 1:
+            for group in groups:
+                yield group, self._fetch_chunk_group([chunks[i] for i in group])
+            return
+
+        with ThreadPoolExecutor(max_workers=self._backfill_concurrency) as executor:
+            futures = deque()
+            for group in groups:
+                futures.append((group, executor.submit(self._fetch_chunk_group, [chunks[i] for i in group])))
+                if len(futures) >= self._backfill_concurrency:
+                    group, future = futures.popleft()
+                    yield group, future.result()
+            while len(futures) > 0:
+                group, future = futures.popleft()
+                yield group, future.result()
+
+    def _fetch_chunk_group(self, chunks):
+        from_block = chunks[0][0]
+        to_block = chunks[-1][1]
+        self._logger.debug(
+            'EventIndexer._fetch_chunk_group from_block {} to_block {} chunk count {}'.format(
+                from_block, to_block, len(chunks)))
+
+        events, bisected = self._get_events_bisect(from_block, to_block)
+        self._adapt_get_logs_window(len(chunks), len(events), bisected)
+
+        results = [[] for _ in chunks]
+        for event in events:
+            results[(event['blockNumber'] - from_block) // self._get_logs_limit].append(event)
+
+        if self._redis_client is not None:
+            pipe = self._redis_client.pipeline(transaction=False)
+            count = 0
+            for (chunk_from_block, chunk_to_block), chunk_events in zip(chunks, results):
+                if self._is_cacheable_chunk(chunk_from_block, chunk_to_block):
+                    pipe.set(
+                        _chunk_key(chunk_from_block, chunk_to_block),
+                        encode_events(chunk_events, compress=self._cache_compression)
+                    )
+                    count += 1
+            if count > 0:
+                pipe.execute()
+        return results
+
+    # 結果が多すぎる、範囲が広すぎる、タイムアウトなどのエラーでは範囲を半分にして取り直す
+    def _get_events_bisect(self, from_block, to_block):
+        self._rate_limit()
+        try:
+            events = get_events(
                 self._contract,
                 from_block=from_block,
-                to_block=to_block
+                to_block=to_block,
+                event_names=_event_names,
             )
-            self._redis_client.set(key, pickle.dumps(value))
-        else:
+            return [compact_event(event) for event in events], False
+        except Exception as e:
+            if from_block == to_block or not _is_get_logs_limit_error(e):
+                raise
             self._logger.debug(
-                'EventIndexer._cached_fetch_events from_block {} to_block {} cache hit'.format(from_block, to_block))
-            value = pickle.loads(value)
-
-        return value
+                'EventIndexer._get_events_bisect from_block {} to_block {} bisect {}'.format(
+                    from_block, to_block, e))
+
+        mid_block = (from_block + to_block) // 2
+        events_left, _ = self._get_events_bisect(from_block, mid_block)
+        events_right, _ = self._get_events_bisect(mid_block + 1, to_block)
+        return events_left + events_right, True
+
+    # イベントがまばらな区間では窓を広げ、分割が必要だったら狭める
+    def _adapt_get_logs_window(self, chunk_count, event_count, bisected):
+        if bisected:
+            self._get_logs_window = max(1, self._get_logs_window // 2)
+        elif chunk_count == self._get_logs_window and event_count < self._get_logs_target_event_count:
+            self._get_logs_window = min(self._max_get_logs_window, self._get_logs_window * 2)
+
+    # 未確定のブロックを含むchunkはreorgで変わりうるのでキャッシュしない
+    def _is_cacheable_chunk(self, from_block, to_block):
+        return (self._redis_client is not None
+                and to_block - from_block + 1 == self._get_logs_limit
+                and to_block <= self._confirmed_block_number)
+
+    def _get_block_hash(self, block_number):
+        self._rate_limit()
+        return bytes(self._w3.eth.get_block(block_number)['hash'])
+
+    # 記録したhashが変わっていたらreorg
+    # hashが一致する最後のブロックを返す (それより前のブロックは変わっていない)
+    def _find_rollback_block_number(self):
+        if len(self._tail_block_hashes) == 0:
+            return None
+
+        block_numbers = sorted(self._tail_block_hashes)
+        if self._get_block_hash(block_numbers[-1]) == self._tail_block_hashes[block_numbers[-1]]:
+            return None
+
+        valid_block_number = min(self._confirmed_block_number, block_numbers[0] - 1)
+        low = 0
+        high = len(block_numbers) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if self._get_block_hash(block_numbers[mid]) == self._tail_block_hashes[block_numbers[mid]]:
+                valid_block_number = block_numbers[mid]
+                low = mid + 1
+            else:
+                high = mid
+
+        self._logger.info('EventIndexer reorg detected. rollback to block {}'.format(valid_block_number))
+        return valid_block_number
+
+    def _rollback(self, block_number):
+        while len(self._tail_journal) > 0 and self._tail_journal[-1][0] > block_number:
+            _, table_name, previous_row = self._tail_journal.pop()
+            table = self._tables()[table_name]
+            if previous_row is None:
+                table.remove_last()
+            else:
+                table.upsert(previous_row)
+
+        for tail_block_number in list(self._tail_block_hashes):
+            if tail_block_number > block_number:
+                del self._tail_block_hashes[tail_block_number]
+
+        self._last_block_number = min(self._last_block_number, block_number)
+
+    def _trim_tail(self):
+        while len(self._tail_journal) > 0 and self._tail_journal[0][0] <= self._confirmed_block_number:
+            self._tail_journal.popleft()
+
+        for tail_block_number in list(self._tail_block_hashes):
+            if tail_block_number <= self._confirmed_block_number:
+                del self._tail_block_hashes[tail_block_number]
 
     def _process_event(self, event):
-        event_name = event['event']
-        args = convert_keys_to_snake_case(event['args'])
-
-        if event_name == 'PublicKeyChanged':
-            self._public_keys = upsert(
-                self._public_keys, args, ['owner'])
-        elif event_name == 'TournamentCreated':
-            self._tournaments = insert_if_not_exist(
-                self._tournaments, args, ['tournament_id'])
-        elif event_name == 'ModelCreated':
-            self._models = insert_if_not_exist(
-                self._models, args, ['model_id'])
-        elif event_name == 'PredictionCreated':
-            self._predictions = insert_if_not_exist(
-                self._predictions, args, ['model_id', 'execution_start_at'])
-        elif event_name == 'PredictionKeyPublished':
-
-
-            self._prediction_key_publications = insert_if_not_exist(
-                self._prediction_key_publications, args,
-                ['owner', 'tournament_id', 'execution_start_at']
-            )
-        elif event_name == 'PredictionKeySent':
-            self._prediction_key_sendings = insert_if_not_exist(
-                self._prediction_key_sendings, args,
-                ['owner', 'tournament_id', 'execution_start_at', 'receiver']
-            )
-
-
-def upsert(df, row, indicies):
-    idx = df[indicies[0]] == row[indicies[0]]
-    for col in indicies[1:]:
-        idx &= df[df[col] == row[col]]
-    if df.loc[idx].shape[0] == 0:
-        df = df.append(row, ignore_index=True)
-    else:
-        for col in row:
-            df.loc[idx, col] = row[col]
-    return df
-
-
-def insert_if_not_exist(df, row, indicies):
-    idx = df[indicies[0]] == row[indicies[0]]
-    for col in indicies[1:]:
-        idx &= df[col] == row[col]
-    if df.loc[idx].shape[0] == 0:
-        df = df.append(row, ignore_index=True)
-    return df
-
-
-def _filter_df(df, conditions):
-    for name, value in conditions:
-        if value is not None:
-            df = df.loc[df[name] == value]
-    return df.copy()
+        table_name = _event_tables.get(event['event'])
+        if table_name is None:
+            return False
+        table = self._tables()[table_name]
+        args = event['args']
+
+        if event['event'] in _upsert_event_names:
+            previous_row = table.upsert(args)
+        elif table.insert_if_not_exist(args):
+            previous_row = None
+        else:
+            return False
+
+        block_number = event['blockNumber']
+        if block_number > self._confirmed_block_number:
+            self._tail_journal.append((block_number, table_name, previous_row))
+            if event.get('blockHash') is not None:
+                self._tail_block_hashes[block_number] = event['blockHash']
+        return True
+
+
+def _chunk_key(from_block, to_block):
+    return 'event_indexer:v{}:{}:{}'.format(codec_version, from_block, to_block)
+
+
+# 連続した値をmax_size_func()個までのグループにまとめる
+# generatorなので、max_size_funcは前のグループを処理した後に評価される
+def _group_consecutive(values, max_size_func):
+    group = []
+    for value in values:
+        if len(group) > 0 and (group[-1] + 1 != value or len(group) >= max_size_func()):
+            yield group
+            group = []
+        group.append(value)
+    if len(group) > 0:
+        yield group
+
+
+# ブロック範囲や結果の件数の上限によるエラーだけを分割の対象にする
+# rate limitなど他のエラーで分割するとリクエストが増えるだけなので、そのまま投げる
+def _is_get_logs_limit_error(e):
+    if not isinstance(e, ValueError):
+        return False
+    if len(e.args) > 0 and isinstance(e.args[0], dict) and e.args[0].get('code') == -32005:
+        return True
+    message = str(e).lower()
+    return any(x in message for x in [
+        'block range', 'query returned more than', 'response size exceeded',
+    ]) or re.search(r'more than \d+ results', message) is not None
 
 
 def _floor_int(a, b, remainder):
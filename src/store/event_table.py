@@ -0,0 +1,160 @@
+from bisect import insort
+from collections import defaultdict
+import pandas as pd
+
+
+# eventを溜めるためのテーブル
+# unique keyのdictで重複を判定し、カラムごとのlistにappendする
+# DataFrameは読み出し時にまとめて作る (appendのたびにコピーしない)
+# index_columnsで指定したカラムは値 -> 行番号(昇順)のindexを持つ
+
+class EventTable:
+    def __init__(self, columns, unique_keys, index_columns=None):
+        self._columns = list(columns)
+        self._unique_keys = list(unique_keys)
+        self._data = {col: [] for col in self._columns}
+        self._row_count = 0
+        self._rows_by_key = {}
+        self._indexes = {col: defaultdict(list) for col in (index_columns or [])}
+        self._df = None
+
+    def __len__(self):
+        return self._row_count
+
+    def insert_if_not_exist(self, row):
+        key = self._key(row)
+        if key in self._rows_by_key:
+            return False
+        self._append(key, row)
+        return True
+
+    # 更新した場合は更新前の行を返す (rollback用)
+    def upsert(self, row):
+        key = self._key(row)
+        idx = self._rows_by_key.get(key)
+        if idx is None:
+            self._append(key, row)
+            return None
+
+        previous_row = {col: self._data[col][idx] for col in self._columns}
+        for col in row:
+            self._ensure_column(col)
+            if col in self._indexes:
+                self._reindex(col, idx, self._data[col][idx], row[col])
+            self._data[col][idx] = row[col]
+        self._df = None
+        return previous_row
+
+    # unique keyのtupleで一行を引く
+    def get(self, key):
+        idx = self._rows_by_key.get(key)
+        if idx is None:
+            return None
+        return {col: self._data[col][idx] for col in self._columns}
+
+    # 最後に追加した行を削除する (rollback用)
+    def remove_last(self):
+        idx = self._row_count - 1
+        row = {col: self._data[col].pop() for col in self._columns}
+        del self._rows_by_key[self._key(row)]
+        for col in self._indexes:
+            index = self._indexes[col]
+            index[row[col]].pop()
+            if len(index[row[col]]) == 0:
+                del index[row[col]]
+        self._row_count = idx
+        self._df = None
+
+    # conditions: [(column, value)] valueがNoneの条件は無視
+    # copy=Falseのときは内部のDataFrameを返すことがあるので、呼び出し側で変更しないこと
+    # 条件があるときは全体のDataFrameを作らず、該当する行だけから作る
+    def fetch(self, conditions, copy=True):
+        rows = self._select_rows(conditions)
+        if rows is None:
+            df = self.to_df()
+            return df.copy() if copy else df
+        index = pd.Index(rows, dtype='int64')
+        return pd.DataFrame({
+            col: pd.Series([self._data[col][idx] for idx in rows], index=index, dtype=object)
+            for col in self._columns
+        }, index=index, columns=self._columns)
+
+    def to_df(self):
+        if self._df is None and self._row_count == 0:
+            self._df = pd.DataFrame(columns=self._columns)
+        elif self._df is None:
+            self._df = pd.DataFrame({
+                col: pd.Series(self._data[col], dtype=object)
+                for col in self._columns
+            }, columns=self._columns)
+        return self._df
+
+    def to_snapshot(self):
+        return {
+            'columns': list(self._columns),
+            'data': {col: list(self._data[col]) for col in self._columns},
+        }
+
+    # unique keyとindexはsnapshotに含めず作り直す
+    def load_snapshot(self, snapshot):
+        self._columns = list(snapshot['columns'])
+        self._data = {col: list(snapshot['data'][col]) for col in self._columns}
+        self._row_count = len(self._data[self._columns[0]])
+        self._rows_by_key = {}
+        for col in self._indexes:
+            self._indexes[col] = defaultdict(list)
+
+        for idx in range(self._row_count):
+            row = {col: self._data[col][idx] for col in self._columns}
+            self._rows_by_key[self._key(row)] = idx
+            for col in self._indexes:
+                self._indexes[col][row[col]].append(idx)
+        self._df = None
+
+    def _select_rows(self, conditions):
+        conditions = [(col, value) for col, value in conditions if value is not None]
+        if len(conditions) == 0:
+            return None
+
+        indexed = [
+            self._indexes[col].get(value, [])
+            for col, value in conditions if col in self._indexes
+        ]
+        if len(indexed) > 0:
+            rows = min(indexed, key=len)
+        else:
+            rows = range(self._row_count)
+
+        return [
+            idx for idx in rows
+            if all(self._data[col][idx] == value for col, value in conditions)
+        ]
+
+    def _reindex(self, col, idx, old_value, new_value):
+        if old_value == new_value:
+            return
+        index = self._indexes[col]
+        index[old_value].remove(idx)
+        if len(index[old_value]) == 0:
+            del index[old_value]
+        insort(index[new_value], idx)
+
+    def _key(self, row):
+        return tuple(row[col] for col in self._unique_keys)
+
+    def _append(self, key, row):
+        for col in row:
+            self._ensure_column(col)
+        for col in self._columns:
+            self._data[col].append(row.get(col))
+        for col in self._indexes:
+            self._indexes[col][row.get(col)].append(self._row_count)
+        self._rows_by_key[key] = self._row_count
+        self._row_count += 1
+        self._df = None
+
+    def _ensure_column(self, col):
+        # DataFrame.appendと同じく、未知のカラムは末尾に追加する
+        if col not in self._data:
+            self._columns.append(col)
+            self._data[col] = [None] * self._row_count
@@ -1,5 +1,7 @@
 from web3 import Web3
+from concurrent.futures import Future, ThreadPoolExecutor
 import threading
+import numpy as np
 import pandas as pd
 from nacl.public import PublicKey, PrivateKey, SealedBox
 from nacl.secret import SecretBox
@@ -7,11 +9,15 @@ import nacl.utils
 from nacl.exceptions import CryptoError
 import pickle
 from .event_indexer import EventIndexer
+from ..cache import LruCache, TtlCache
 from ..logger import create_null_logger
-from ..web3 import get_account_address, transact
+from ..web3 import get_account_address, TransactionManager
+from ..web3.gas_batch_planner import GasBatchPlanner
 
 
 # thread safe
+# 書き込みは_write_lockで直列化する (ロックは送信まで。確定待ちは*_asyncが返すfutureで行う)
+# 読み込みはStoreのロックを取らず、indexerのテーブルを同じ時点で読む
 # 暗号化などを隠蔽する
 # 自分の予測は購入できないので、シミュレーションする
 # インターフェースはsnakecase
@@ -26,22 +32,62 @@ from ..web3 import get_account_address, transact
 class Store:
     def __init__(self, w3, contract, chain_id, logger=None,
                  rate_limiter=None, start_block_number=None,
-                 redis_client=None, max_priority_fee_scale=None):
+                 redis_client=None, max_priority_fee_scale=None,
+                 snapshot_interval_sec=None, backfill_concurrency=None,
+                 confirmation_blocks=None, poll_interval_sec=None,
+                 content_cache_size=None, content_cache_redis=False,
+                 decrypt_concurrency=None, gas_budget=None):
         self._w3 = w3
         self._contract = contract
-        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # 送信済みで未確定のもの (重複して送らないため)
+        # _pending_modelsはmodel_id -> 確定待ちのfuture
+        self._pending_models = {}
+        self._pending_publications = set()
+        self._confirm_executor = ThreadPoolExecutor(max_workers=4)
+        # receiptのブロックがindexerに取り込まれるのを待つ上限 (wait_for_transaction_receiptのデフォルトに合わせる)
+        self._confirm_timeout_sec = 120
         self._event_indexer = EventIndexer(
             w3, contract,
             logger=logger,
             rate_limiter=rate_limiter,
             start_block_number=start_block_number,
             redis_client=redis_client,
+            snapshot_interval_sec=snapshot_interval_sec,
+            backfill_concurrency=backfill_concurrency,
+            confirmation_blocks=confirmation_blocks,
+            poll_interval_sec=poll_interval_sec,
         )
         self._logger = create_null_logger() if logger is None else logger
         self._rate_limiter = rate_limiter
         self._redis_client = redis_client
         self._chain_id = chain_id
-        self._max_priority_fee_scale = max_priority_fee_scale
+        self._transaction_manager = TransactionManager(
+            w3,
+            rate_limit_func=self._rate_limit,
+            gas_buffer=20000,
+            max_priority_fee_scale=max_priority_fee_scale,
+            logger=self._logger,
+        )
+        self._gas_batch_planner = GasBatchPlanner(
+            gas_budget=gas_budget,
+            rate_limit_func=self._rate_limit,
+            logger=self._logger,
+        )
+
+        # チェーン上のデータは変わらないので、復号結果をキャッシュする
+        content_cache_size = 100000 if content_cache_size is None else content_cache_size
+        self._content_cache = LruCache(maxsize=content_cache_size)
+        self._content_key_cache = LruCache(maxsize=content_cache_size)
+        self._content_cache_redis = content_cache_redis
+
+        # redisのexpireatと同じ期限でメモリにもキャッシュする (見つかったものだけ)
+        self._prediction_key_info_cache = TtlCache()
+
+        decrypt_concurrency = 1 if decrypt_concurrency is None else decrypt_concurrency
+        self._decrypt_executor = None
+        if decrypt_concurrency > 1:
+            self._decrypt_executor = ThreadPoolExecutor(max_workers=decrypt_concurrency)
 
         private_key_key = 'private_key'
         private_key = self._redis_client.get(private_key_key)
@@ -53,14 +99,32 @@ class Store:
 
         self._change_public_key()
 
+    # start_threadするとindexerがバックグラウンドで同期し、readでRPCしなくなる
+    def start_thread(self):
+        self._event_indexer.start_thread()
+
+    # 確定待ちはindexerのスレッドを待つので、indexerより先に止める
+    def terminate_thread(self):
+        self._confirm_executor.shutdown(wait=True)
+        self._event_indexer.terminate_thread()
+        if self._decrypt_executor is not None:
+            self._decrypt_executor.shutdown(wait=True)
+
     # redis
 
     def _prediction_key_info(self, tournament_id, execution_start_at, create=False):
         key = _prediction_key_info_key(tournament_id, execution_start_at)
+        expire_at = execution_start_at + 2 * 24 * 60 * 60
+        info = self._prediction_key_info_cache.get(key)
+        if info is not None:
+            return info
+
         value = self._redis_client.get(key)
 
         if value is not None:
-            return pickle.loads(value)
+            info = pickle.loads(value)
+            self._prediction_key_info_cache.set(key, info, expire_at)
+            return info
 
         if not create:
             return None
@@ -73,33 +137,52 @@ class Store:
                 [content_key_generator, self.default_account_address()]
             )
         }
-        self._redis_client.set(key, pickle.dumps(info))
-        self._redis_client.expireat(key, execution_start_at + 2 * 24 * 60 * 60)
+        # setとexpireatを一回の往復で送る
+        pipe = self._redis_client.pipeline(transaction=False)
+        pipe.set(key, pickle.dumps(info))
+        pipe.expireat(key, expire_at)
+        pipe.execute()
+        self._prediction_key_info_cache.set(key, info, expire_at)
         return info
 
     # read
 
     def get_balance(self):
-        with self._lock:
-            self._rate_limit()
-            return self._w3.eth.get_balance(self.default_account_address())
+        self._rate_limit()
+        return self._w3.eth.get_balance(self.default_account_address())
 
     def fetch_tournament(self, tournament_id: str):
-        with self._lock:
-            return self._event_indexer.fetch_tournaments(tournament_id=tournament_id).iloc[0].to_dict()
+        return self._event_indexer.fetch_tournaments(tournament_id=tournament_id).iloc[0].to_dict()
+
+    # イベントが反映されるたびに変わる値 (fetch_predictionsの結果が変わったかの判定用)
+    def fetch_event_revision(self, without_fetch_events: bool = False):
+        return self._event_indexer.fetch_revision(without_fetch_events=without_fetch_events)
 
     def fetch_predictions(self, tournament_id: str, execution_start_at: int, without_fetch_events: bool = False):
-        with self._lock:
-            models = self._event_indexer.fetch_models(
-                tournament_id=tournament_id,
-                without_fetch_events=without_fetch_events,
-            )
-            predictions = self._event_indexer.fetch_predictions(
-                execution_start_at=execution_start_at,
-                without_fetch_events=True,
-            )
-            predictions = predictions.loc[predictions['model_id'].isin(models['model_id'].unique())]
-            return self._predictions_to_dict_list(predictions)
+        return self._fetch_predictions(tournament_id, [execution_start_at], without_fetch_events)
+
+    # 複数ラウンドの予測を一度にlong formatのDataFrameで返す
+    # 行はexecution_start_atsの順、各ラウンド内はfetch_predictionsと同じ順
+    def fetch_predictions_range(self, tournament_id: str, execution_start_ats, without_fetch_events: bool = False):
+        predictions = self._fetch_predictions(tournament_id, execution_start_ats, without_fetch_events)
+        return pd.DataFrame(predictions, columns=_prediction_columns)
+
+    def _fetch_predictions(self, tournament_id, execution_start_ats, without_fetch_events):
+        if not without_fetch_events:
+            self._event_indexer.sync()
+
+        # 鍵の解決だけindexerのロック内で行い、復号はロックの外で行う
+        predictions = []
+        with self._event_indexer.read_lock():
+            for execution_start_at in execution_start_ats:
+                round_predictions = self._event_indexer.fetch_predictions(
+                    execution_start_at=execution_start_at,
+                    without_fetch_events=True,
+                    copy=False,
+                )
+                predictions += self._resolve_prediction_keys(round_predictions, tournament_id)
+
+        return self._predictions_to_dict_list(predictions)
 
     # write
 
@@ -120,17 +203,20 @@ class Store:
         return {'receipt': dict(receipt)}
 
     def create_models_if_not_exist(self, params_list):
+        return self.create_models_if_not_exist_async(params_list).result()
+
+    def create_models_if_not_exist_async(self, params_list):
         self._logger.debug('Store.create_models_if_not_exist called {}'.format(params_list))
 
-        with self._lock:
+        with self._write_lock:
             params_list2 = []
             for params in params_list:
                 model_id = params['model_id']
                 tournament_id = params['tournament_id']
                 prediction_license = params['prediction_license']
 
-                models = self._event_indexer.fetch_models(model_id=model_id)
-                if models.shape[0] > 0:
+                models = self._event_indexer.fetch_models(model_id=model_id, copy=False)
+                if models.shape[0] > 0 or model_id in self._pending_models:
                     self._logger.debug(
                         'Store.create_models_if_not_exist model({}) already exists. skipped'.format(model_id))
                     continue
@@ -143,27 +229,75 @@ class Store:
 
             if len(params_list2) == 0:
                 self._logger.debug('Store.create_models_if_not_exist no new models. skipped')
-                return {}
+                return _completed_future({})
 
-            receipt = self._transact(
+            tx_hash = self._transaction_manager.send(
                 self._contract.functions.createModels(params_list2),
                 self._default_tx_options()
             )
-            self._logger.debug(
-                'Store.create_models_if_not_exist done {} receipt {}'.format(params_list2, dict(receipt)))
-            return {'receipt': dict(receipt)}
+
+            def finalize():
+                for params in params_list2:
+                    self._pending_models.pop(params['modelId'], None)
+
+            future = self._confirm_async(
+                tx_hash,
+                'Store.create_models_if_not_exist done {}'.format(params_list2),
+                finalize,
+            )
+            for params in params_list2:
+                self._pending_models[params['modelId']] = future
+
+        return future
 
     def create_predictions(self, params_list):
+        return self.create_predictions_async(params_list).result()
+
+    def create_predictions_async(self, params_list):
         self._logger.debug('Store.create_predictions called {}'.format(params_list))
 
-        with self._lock:
+        # gasの見積もりにはモデルが必要なので、作成中のモデルが確定してから送る
+        with self._write_lock:
+            pending_futures = {
+                params['model_id']: self._pending_models[params['model_id']] for params in params_list
+                if params['model_id'] in self._pending_models
+            }
+        if len(pending_futures) == 0:
+            return self._create_predictions_async(params_list)
+
+        result = Future()
+
+        def on_models_done():
+            # 作成に失敗したモデルの予測だけ落とす
+            failed_model_ids = set()
+            for model_id, future in pending_futures.items():
+                if future.exception() is not None:
+                    self._logger.error('Store.create_predictions model({}) creation failed. dropped {}'.format(
+                        model_id, future.exception()))
+                    failed_model_ids.add(model_id)
+            try:
+                _chain_future(self._create_predictions_async([
+                    params for params in params_list
+                    if params['model_id'] not in failed_model_ids
+                ]), result)
+            except Exception as e:
+                result.set_exception(e)
+
+        _when_all_done(set(pending_futures.values()), on_models_done)
+        return result
+
+    def _create_predictions_async(self, params_list):
+        with self._write_lock:
             params_list2 = []
             for params in params_list:
                 model_id = params['model_id']
                 execution_start_at = params['execution_start_at']
                 content = params['content']
 
-                models = self._event_indexer.fetch_models(model_id=model_id)
+                models = self._event_indexer.fetch_models(model_id=model_id, copy=False)
+                if models.shape[0] == 0:
+                    self._logger.error('Store.create_predictions model({}) not found. dropped'.format(model_id))
+                    continue
                 tournament_id = models.iloc[0]['tournament_id']
 
                 info = self._prediction_key_info(
@@ -181,27 +315,31 @@ class Store:
                 })
 
             if len(params_list2) == 0:
-                return {}
-
-            receipt = self._transact(
-                self._contract.functions.createPredictions(params_list2),
-                self._default_tx_options()
+                return _completed_future({})
+
+            return self._send_batches(
+                'createPredictions',
+                params_list2,
+                lambda x: self._contract.functions.createPredictions(x),
+                lambda x: len(x['encryptedContent']),
+                'Store.create_predictions done',
             )
-            self._logger.debug('Store.create_predictions done {} receipt {}'.format(params_list2, dict(receipt)))
-            return {'receipt': dict(receipt)}
 
     def send_prediction_keys(self, tournament_id, execution_start_at, receivers):
+        return self.send_prediction_keys_async(tournament_id, execution_start_at, receivers).result()
+
+    def send_prediction_keys_async(self, tournament_id, execution_start_at, receivers):
         self._logger.debug('Store.send_prediction_keys called {} {} {}'.format(tournament_id, execution_start_at, receivers))
 
-        with self._lock:
+        with self._write_lock:
             publications = self._event_indexer.fetch_prediction_key_publications(
                 owner=self.default_account_address(),
                 tournament_id=tournament_id,
                 execution_start_at=execution_start_at
             )
-            if publications.shape[0] > 0:
+            if publications.shape[0] > 0 or (tournament_id, execution_start_at) in self._pending_publications:
                 self._logger.debug('send_prediction_keys skipped because already published')
-                return {}
+                return _completed_future({})
 
             prediction_info = self._prediction_key_info(
                 tournament_id=tournament_id,
@@ -209,7 +347,7 @@ class Store:
             )
             if prediction_info is None:
                 self._logger.debug('send_prediction_keys skipped because prediction_info is None')
-                return {}
+                return _completed_future({})
 
             content_key = prediction_info['content_key']
 
@@ -235,31 +373,36 @@ class Store:
                 })
 
             if len(params_list2) == 0:
-                return {}
+                return _completed_future({})
 
-            receipt = self._transact(
-                self._contract.functions.sendPredictionKeys(
+            return self._send_batches(
+                'sendPredictionKeys',
+                params_list2,
+                lambda x: self._contract.functions.sendPredictionKeys(
                     tournament_id,
                     execution_start_at,
-                    params_list2,
+                    x,
                 ),
-                self._default_tx_options()
+                lambda x: len(x['encryptedContentKey']),
+                'Store.send_prediction_keys done',
             )
-            self._logger.debug('Store.send_prediction_keys done {} receipt {}'.format(params_list2, dict(receipt)))
-            return {'receipt': dict(receipt)}
 
     def publish_prediction_key(self, tournament_id: str, execution_start_at: int):
+        return self.publish_prediction_key_async(tournament_id, execution_start_at).result()
+
+    def publish_prediction_key_async(self, tournament_id: str, execution_start_at: int):
         self._logger.debug('Store.publish_prediction_key called {} {}'.format(tournament_id, execution_start_at))
 
-        with self._lock:
+        publication_key = (tournament_id, execution_start_at)
+        with self._write_lock:
             publications = self._event_indexer.fetch_prediction_key_publications(
                 owner=self.default_account_address(),
                 tournament_id=tournament_id,
                 execution_start_at=execution_start_at,
             )
-            if publications.shape[0] > 0:
+            if publications.shape[0] > 0 or publication_key in self._pending_publications:
                 self._logger.debug('Store.publish_prediction_key skipped because already published.')
-                return {}
+                return _completed_future({})
 
             prediction_info = self._prediction_key_info(
                 tournament_id=tournament_id,
@@ -267,7 +410,7 @@ class Store:
             )
             if prediction_info is None:
                 self._logger.debug('publish_prediction_key skipped because prediction_info is None')
-                return {}
+                return _completed_future({})
 
             models = self._event_indexer.fetch_models(
                 owner=self.default_account_address(),
@@ -278,9 +421,9 @@ class Store:
             )
             if predictions[predictions['model_id'].isin(models['model_id'])].shape[0] == 0:
                 self._logger.debug('publish_prediction_key skipped because no predictions')
-                return {}
+                return _completed_future({})
 
-            receipt = self._transact(
+            tx_hash = self._transaction_manager.send(
                 self._contract.functions.publishPredictionKey(
                     tournament_id,
                     execution_start_at,
@@ -288,82 +431,208 @@ class Store:
                 ),
                 self._default_tx_options()
             )
-            self._logger.debug('Store.publish_predictions done {} receipt {}'.format(prediction_info['content_key_generator'], dict(receipt)))
-            return {'receipt': dict(receipt)}
+            self._pending_publications.add(publication_key)
 
-    def _predictions_to_dict_list(self, predictions):
-        predictions = predictions.copy()
+        def finalize():
+            self._pending_publications.discard(publication_key)
 
-        # modelをjoin
-        models = self._event_indexer.fetch_models(
-            without_fetch_events=True,
-        )
-        predictions = predictions.merge(
-            models[['model_id', 'owner', 'tournament_id']],
-            on=['model_id'],
-            how='left'
+        return self._confirm_async(
+            tx_hash,
+            'Store.publish_predictions done {}'.format(prediction_info['content_key_generator']),
+            finalize,
         )
 
-        # published prediction
-        publications = self._event_indexer.fetch_prediction_key_publications(
-            without_fetch_events=True,
-        )
-        predictions = predictions.merge(
-            publications[['owner', 'tournament_id', 'execution_start_at', 'content_key']],
-            on=['owner', 'tournament_id', 'execution_start_at'],
-            how='left'
+    # gas_budgetに収まるように分けて、続けて送る (nonceは連番になる)
+    # 一部のchunkが失敗しても成功したものは返す (全部失敗したら例外)
+    # 結果: {'receipt': 最初のreceipt, 'receipts': [...], 'failures': [{'params_list', 'error'}]}
+    # _write_lockの中で呼ぶ
+    def _send_batches(self, name, params_list, create_func, size_func, message):
+        options = self._default_tx_options()
+        chunks, failures = self._gas_batch_planner.plan(name, params_list, create_func, size_func, options)
+        for failure in failures:
+            self._logger.error('Store._send_batches {} estimate_gas failed. dropped {} {}'.format(
+                name, failure['item'], failure['error']))
+
+        futures = []
+        for chunk in chunks:
+            try:
+                tx_hash = self._transaction_manager.send(create_func(chunk), options)
+                futures.append(self._confirm_async(tx_hash, '{} {}'.format(message, chunk)))
+            except Exception as e:
+                futures.append(_failed_future(e))
+
+        return _gather_batch_results(
+            chunks + [[failure['item']] for failure in failures],
+            futures + [_failed_future(failure['error']) for failure in failures],
+            self._logger,
         )
 
-        # 自分の予測はcontent_keyをくっつける
-        for idx in predictions.loc[predictions['owner'] == self.default_account_address()].index:
-            tournament_id = predictions.loc[idx, 'tournament_id']
-            execution_start_at = predictions.loc[idx, 'execution_start_at']
-
-            prediction_key_info = self._prediction_key_info(
-                tournament_id=tournament_id,
-                execution_start_at=execution_start_at
-            )
-            if prediction_key_info is None:
-                continue
-
-            content_key = prediction_key_info['content_key']
-            predictions.loc[idx, 'content_key'] = content_key
+    # 確定待ちはバックグラウンドで行い、receiptを返すfutureを返す
+    # 確定したらindexerがそのブロックまで同期するのを待つので、futureの完了後のfetch_*には結果が反映されている
+    # finalizeは成功しても失敗しても_write_lockの中で呼ばれる
+    def _confirm_async(self, tx_hash, message, finalize=None):
+        def confirm():
+            try:
+                receipt = self._transaction_manager.wait(tx_hash)
+                if not self._event_indexer.wait_for_block(receipt['blockNumber'], timeout=self._confirm_timeout_sec):
+                    raise Exception('{} timeout waiting for block {}'.format(message, receipt['blockNumber']))
+            finally:
+                if finalize is not None:
+                    with self._write_lock:
+                        finalize()
+            self._logger.debug('{} receipt {}'.format(message, dict(receipt)))
+            return {'receipt': dict(receipt)}
 
-        # sendされたものはcontent_keyをjoin
-        sendings = self._event_indexer.fetch_prediction_key_sendings(
-            receiver=self.default_account_address(),
-            without_fetch_events=True,
-        )
-        predictions = predictions.merge(
-            sendings[['owner', 'tournament_id', 'execution_start_at', 'encrypted_content_key']],
-            on=['owner', 'tournament_id', 'execution_start_at'],
-            how='left'
-        )
+        return self._confirm_executor.submit(confirm)
 
+    # modelとpublication, sendingをunique keyで引いてjoinする (indexerのread_lockの中で呼ぶ)
+    # 見つからないカラムはmergeと同じくnan
+    def _resolve_prediction_keys(self, predictions, tournament_id):
+        my_address = self.default_account_address()
         results = []
-        for _, prediction in predictions.iterrows():
-            content = None
-            if pd.isna(prediction['content_key']) and not pd.isna(prediction['encrypted_content_key']):
-                unseal_box = SealedBox(self._private_key)
-                try:
-                    prediction['content_key'] = unseal_box.decrypt(prediction['encrypted_content_key'])
-                except CryptoError as e:
-                    self._logger.warn('failed to decrypt encrypted_content_key. ignored {}'.format(e))
-
-            if not pd.isna(prediction['content_key']):
-                box = SecretBox(prediction['content_key'])
-                try:
-                    content = box.decrypt(prediction['encrypted_content'])
-                except CryptoError as e:
-                    self._logger.warn('failed to decrypt encrypted_content. ignored {}'.format(e))
+        for prediction in predictions.to_dict('records'):
+            model = self._event_indexer.get_model(prediction['model_id'])
+            if model is None or model['tournament_id'] != tournament_id:
+                continue
 
+            key = (model['owner'], model['tournament_id'], prediction['execution_start_at'])
+            publication = self._event_indexer.get_prediction_key_publication(*key)
+            sending = self._event_indexer.get_prediction_key_sending(*key, my_address)
             results.append({
-                **prediction.to_dict(),
-                'content': content,
+                **prediction,
+                'owner': model['owner'],
+                'tournament_id': model['tournament_id'],
+                'content_key': np.nan if publication is None else publication['content_key'],
+                'encrypted_content_key': np.nan if sending is None else sending['encrypted_content_key'],
             })
-
         return results
 
+    def _predictions_to_dict_list(self, predictions):
+        my_address = self.default_account_address()
+
+        for prediction in predictions:
+            # 自分の予測はcontent_keyをくっつける
+            if prediction['owner'] == my_address:
+                prediction_key_info = self._prediction_key_info(
+                    tournament_id=prediction['tournament_id'],
+                    execution_start_at=prediction['execution_start_at'],
+                )
+                if prediction_key_info is not None:
+                    prediction['content_key'] = prediction_key_info['content_key']
+
+        # sendされたものはcontent_keyを復号
+        unseal_targets = [
+            prediction for prediction in predictions
+            if pd.isna(prediction['content_key']) and not pd.isna(prediction['encrypted_content_key'])
+        ]
+        unseal_results = self._map_decrypt(
+            self._unseal_content_key,
+            [prediction['encrypted_content_key'] for prediction in unseal_targets],
+        )
+        for prediction, (content_key, error) in zip(unseal_targets, unseal_results):
+            if error is not None:
+                self._logger.warn('failed to decrypt encrypted_content_key. ignored {}'.format(error))
+                continue
+            prediction['content_key'] = content_key
+
+        decrypt_targets = [
+            prediction for prediction in predictions
+            if not pd.isna(prediction['content_key'])
+        ]
+        cache_keys = [
+            (prediction['model_id'], prediction['execution_start_at'], bytes(prediction['content_key']))
+            for prediction in decrypt_targets
+        ]
+        unsaved_cache_keys = self._load_content_cache(cache_keys)
+        decrypt_results = self._map_decrypt(
+            self._decrypt_content,
+            cache_keys,
+            [prediction['content_key'] for prediction in decrypt_targets],
+            [prediction['encrypted_content'] for prediction in decrypt_targets],
+        )
+        contents = {}
+        for prediction, (content, error) in zip(decrypt_targets, decrypt_results):
+            if error is not None:
+                self._logger.warn('failed to decrypt encrypted_content. ignored {}'.format(error))
+                continue
+            contents[id(prediction)] = content
+        self._save_content_cache(unsaved_cache_keys)
+
+        return [
+            {
+                **prediction,
+                'content': contents.get(id(prediction)),
+            }
+            for prediction in predictions
+        ]
+
+    # PyNaClは復号中にGILを解放するので、スレッドで並列に復号する
+    # 結果は入力の順番で返し、warnは呼び出し側で順番に出す
+    def _map_decrypt(self, func, *iterables):
+        if self._decrypt_executor is None or len(iterables[0]) <= 1:
+            return list(map(func, *iterables))
+        return list(self._decrypt_executor.map(func, *iterables))
+
+    # 復号に失敗したものはキャッシュしない (毎回warnを出す)
+    # (結果, CryptoError)を返す
+    def _unseal_content_key(self, encrypted_content_key):
+        content_key = self._content_key_cache.get(encrypted_content_key)
+        if content_key is not None:
+            return content_key, None
+
+        unseal_box = SealedBox(self._private_key)
+        try:
+            content_key = unseal_box.decrypt(encrypted_content_key)
+        except CryptoError as e:
+            return None, e
+
+        self._content_key_cache.set(encrypted_content_key, content_key)
+        return content_key, None
+
+    def _decrypt_content(self, cache_key, content_key, encrypted_content):
+        content = self._content_cache.get(cache_key)
+        if content is not None:
+            return content, None
+
+        box = SecretBox(content_key)
+        try:
+            content = box.decrypt(encrypted_content)
+        except CryptoError as e:
+            return None, e
+
+        self._content_cache.set(cache_key, content)
+        return content, None
+
+    # メモリに無いものをredisからmgetでまとめて読む
+    # redisにも無かったkeyを返す (復号後に_save_content_cacheで保存する)
+    def _load_content_cache(self, cache_keys):
+        if not self._content_cache_redis:
+            return []
+
+        missing = [key for key in cache_keys if key not in self._content_cache]
+        unsaved = []
+        for i in range(0, len(missing), _redis_batch_size):
+            batch = missing[i:i + _redis_batch_size]
+            values = self._redis_client.mget([_content_cache_key(*key) for key in batch])
+            for key, value in zip(batch, values):
+                if value is None:
+                    unsaved.append(key)
+                else:
+                    self._content_cache.set(key, value)
+        return unsaved
+
+    def _save_content_cache(self, cache_keys):
+        pipe = self._redis_client.pipeline(transaction=False)
+        count = 0
+        for key in cache_keys:
+            content = self._content_cache.get(key)
+            if content is None:
+                continue
+            pipe.set(_content_cache_key(*key), content, ex=_content_cache_redis_expire_sec)
+            count += 1
+        if count > 0:
+            pipe.execute()
+
     def default_account_address(self):
         return get_account_address(self._w3.eth.default_account)
 
@@ -377,15 +646,92 @@ class Store:
         if self._rate_limiter is not None:
             self._rate_limiter.rate_limit(tags=['default'])
 
+    # 書き込んだ結果がfetch_*で見えるように、indexerがreceiptのブロックまで同期するのを待つ
     def _transact(self, func, options):
-        return transact(
-            func=func,
-            options=options,
-            rate_limit_func=self._rate_limit,
-            gas_buffer=20000,
-            max_priority_fee_scale=self._max_priority_fee_scale
-        )
+        receipt = self._transaction_manager.transact(func, options)
+        self._event_indexer.wait_for_block(receipt['blockNumber'])
+        return receipt
+
+
+def _completed_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _failed_future(e):
+    future = Future()
+    future.set_exception(e)
+    return future
+
+
+def _chain_future(source, target):
+    def on_done(_):
+        e = source.exception()
+        if e is not None:
+            target.set_exception(e)
+        else:
+            target.set_result(source.result())
+
+    source.add_done_callback(on_done)
+
+
+# 全てのfutureが終わったらcallbackを一度だけ呼ぶ
+def _when_all_done(futures, callback):
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                return
+        callback()
+
+    for future in futures:
+        future.add_done_callback(on_done)
+
+
+def _gather_batch_results(chunks, futures, logger):
+    result = Future()
+
+    def on_all_done():
+        receipts = []
+        failures = []
+        for chunk, future in zip(chunks, futures):
+            e = future.exception()
+            if e is None:
+                receipts.append(future.result()['receipt'])
+            else:
+                failures.append({'params_list': chunk, 'error': e})
+
+        if len(receipts) == 0:
+            result.set_exception(failures[0]['error'])
+            return
+        if len(failures) > 0:
+            logger.error('Store batch partially failed {}'.format(failures))
+        result.set_result({
+            'receipt': receipts[0],
+            'receipts': receipts,
+            'failures': failures,
+        })
+
+    _when_all_done(futures, on_all_done)
+    return result
 
 
 def _prediction_key_info_key(tournament_id, execution_start_at):
     return 'prediction_key_info:{}:{}'.format(tournament_id, execution_start_at)
+
+
+_prediction_columns = [
+    'model_id', 'execution_start_at', 'encrypted_content',
+    'owner', 'tournament_id', 'content_key', 'encrypted_content_key', 'content',
+]
+
+_content_cache_redis_expire_sec = 90 * 24 * 60 * 60
+_redis_batch_size = 1000
+
+
+def _content_cache_key(model_id, execution_start_at, content_key):
+    return 'content:{}:{}:{}'.format(model_id, execution_start_at, content_key.hex())
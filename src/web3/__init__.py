@@ -1,16 +1,16 @@
 import os
-import time
+import weakref
 from eth_keyfile import extract_key_from_keyfile
+from eth_utils import event_abi_to_log_topic
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
-from web3.exceptions import (
-    MismatchedABI,
-)
 from web3._utils.events import get_event_data
+from .transaction_manager import TransactionManager
+from .http_provider import PooledHTTPProvider
 
 
-def create_w3(network_name, web3_provider_uri):
-    w3 = Web3(Web3.HTTPProvider(web3_provider_uri))
+def create_w3(network_name, web3_provider_uri, pool_maxsize=None):
+    w3 = Web3(PooledHTTPProvider(web3_provider_uri, pool_maxsize=pool_maxsize))
 
     if network_name in ['mumbai', 'polygon']:
         w3.middleware_onion.inject(geth_poa_middleware, layer=0)
@@ -59,77 +59,62 @@ def get_account_address(account):
         return account
 
 
+# 互換のため残している。nonceやfeeのキャッシュを使う場合はTransactionManagerを使う
 def transact(func, options, rate_limit_func=None, gas_buffer=None, max_priority_fee_scale=None):
-    w3 = func.web3
-    default_account = w3.eth.default_account
-
-    if rate_limit_func is None:
-        rate_limit_func = lambda: ...
-
-    rate_limit_func()
-    if hasattr(default_account, 'key'):
-        # local private key (not work with hardhat https://github.com/nomiclabs/hardhat/issues/1664)
-        options = {
-            **options,
-            'nonce': w3.eth.get_transaction_count(get_account_address(default_account))
-        }
-        if max_priority_fee_scale is not None:
-            options = {
-                **options,
-                'maxFeePerGas': int(max_priority_fee_scale * w3.eth.max_priority_fee) + (2 * w3.eth.get_block('latest')['baseFeePerGas']),
-                'maxPriorityFeePerGas': int(max_priority_fee_scale * w3.eth.max_priority_fee),
-            }
-        tx = func.buildTransaction(options)
-
-        if gas_buffer is not None:
-            options = {
-                **options,
-                'gas': w3.eth.estimate_gas(tx) + gas_buffer,
-            }
-            tx = func.buildTransaction(options)
-
-        signed_tx = w3.eth.account.sign_transaction(tx, private_key=default_account.key)
-        w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = signed_tx.hash
-    else:
-        # remote private key
-        tx_hash = func.transact(options)
-
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    if receipt['status'] == 0:
-        raise Exception('transaction failed {}'.format(dict(receipt)))
-
-    # wait for block number
-    rate_limit_func()
-    while w3.eth.block_number < receipt['blockNumber']:
-        time.sleep(1)
-        rate_limit_func()
-
-    return receipt
+    transaction_manager = TransactionManager(
+        func.web3,
+        rate_limit_func=rate_limit_func,
+        gas_buffer=gas_buffer,
+        max_priority_fee_scale=max_priority_fee_scale,
+    )
+    return transaction_manager.transact(func, options)
 
 
-def get_events(contract, from_block, to_block):
+# event_namesを指定すると、そのイベントだけをtopicでフィルタして取得する
+def get_events(contract, from_block, to_block, event_names=None):
     w3 = contract.web3
+    event_abis = _get_event_abis_by_topic(contract)
+
+    topics = []
+    if event_names is not None:
+        topics = [[
+            Web3.toHex(topic) for topic, abi in event_abis.items()
+            if abi['name'] in event_names
+        ]]
 
     logs = w3.eth.get_logs({
         "fromBlock": from_block,
         "toBlock": to_block,
         "address": contract.address,
-        "topics": []
+        "topics": topics
     })
 
     events = []
 
     for log in logs:
-        for contract_event in contract.events:
-            abi = contract_event._get_event_abi()
+        if len(log['topics']) == 0:
+            continue
+        abi = event_abis.get(bytes(log['topics'][0]))
+        if abi is None:
+            continue
+        events.append(get_event_data(w3.codec, abi, log))
 
-            try:
-                ev = get_event_data(w3.codec, abi, log)
-                events.append(ev)
-            except MismatchedABI:
-                ...
-
-    events.sort(key=lambda x: x['blockNumber'])
+    events.sort(key=lambda x: (x['blockNumber'], x['logIndex']))
 
     return events
+
+
+_event_abis_by_topic_cache = weakref.WeakKeyDictionary()
+
+
+# topic0 -> event abi (contractごとに一度だけ作る)
+def _get_event_abis_by_topic(contract):
+    event_abis = _event_abis_by_topic_cache.get(contract)
+    if event_abis is None:
+        event_abis = {}
+        for contract_event in contract.events:
+            abi = contract_event._get_event_abi()
+            if not abi.get('anonymous', False):
+                event_abis[event_abi_to_log_topic(abi)] = abi
+        _event_abis_by_topic_cache[contract] = event_abis
+    return event_abis
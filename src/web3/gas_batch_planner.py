@@ -0,0 +1,61 @@
+import threading
+from ..logger import create_null_logger
+
+_intrinsic_gas = 21000
+_size_bucket = 256
+
+
+# itemsをgas_budgetに収まるchunkに分ける
+# itemごとのgasは(name, payloadサイズのbucket)ごとに一件だけでestimate_gasした値をキャッシュして使う
+# estimate_gasに失敗したitemは送っても失敗するので、failuresとして返す
+# thread safe
+
+class GasBatchPlanner:
+    def __init__(self, gas_budget=None, rate_limit_func=None, logger=None):
+        self._gas_budget = 10000000 if gas_budget is None else gas_budget
+        self._rate_limit_func = (lambda: ...) if rate_limit_func is None else rate_limit_func
+        self._logger = create_null_logger() if logger is None else logger
+        self._item_gas_cache = {}
+        self._lock = threading.Lock()
+
+    # create_func: itemのlist -> contract function
+    # size_func: item -> payloadのbyte数
+    def plan(self, name, items, create_func, size_func, options):
+        chunks = []
+        failures = []
+        chunk = []
+        chunk_gas = _intrinsic_gas
+        for item in items:
+            try:
+                item_gas = self._estimate_item_gas(name, item, create_func, size_func, options)
+            except Exception as e:
+                self._logger.error('GasBatchPlanner.plan estimate_gas failed {} {}'.format(item, e))
+                failures.append({'item': item, 'error': e})
+                continue
+
+            if len(chunk) > 0 and chunk_gas + item_gas > self._gas_budget:
+                chunks.append(chunk)
+                chunk = []
+                chunk_gas = _intrinsic_gas
+            chunk.append(item)
+            chunk_gas += item_gas
+
+        if len(chunk) > 0:
+            chunks.append(chunk)
+
+        self._logger.debug('GasBatchPlanner.plan {} item count {} chunk count {}'.format(
+            name, len(items), len(chunks)))
+        return chunks, failures
+
+    def _estimate_item_gas(self, name, item, create_func, size_func, options):
+        key = (name, -(-size_func(item) // _size_bucket))
+        with self._lock:
+            item_gas = self._item_gas_cache.get(key)
+        if item_gas is not None:
+            return item_gas
+
+        self._rate_limit_func()
+        item_gas = max(create_func([item]).estimateGas(options) - _intrinsic_gas, 0)
+        with self._lock:
+            self._item_gas_cache[key] = item_gas
+        return item_gas
@@ -0,0 +1,86 @@
+import copy
+import itertools
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import HTTPProvider
+from ..cache import LruCache
+
+# 結果が変わらないメソッド (reorgで変わりうるblock numberでの取得は含めない)
+_immutable_methods = [
+    'eth_chainId',
+    'net_version',
+    'eth_getBlockByHash',
+    'eth_getTransactionByBlockHashAndIndex',
+]
+
+
+# keep-aliveのコネクションプールを使うHTTPProvider
+# 結果が変わらない呼び出しはキャッシュする
+# make_batch_requestで独立した複数の呼び出しを一回のJSON-RPC batchで送れる
+
+class PooledHTTPProvider(HTTPProvider):
+    def __init__(self, endpoint_uri, pool_maxsize=None, timeout=None, cache_size=None):
+        pool_maxsize = 10 if pool_maxsize is None else pool_maxsize
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        # web3のsession cacheはthreadごとなので使わず、全threadで一つのsessionを共有する
+        super().__init__(
+            endpoint_uri,
+            request_kwargs={'timeout': 30 if timeout is None else timeout},
+        )
+        self._session = session
+        self._cache = LruCache(maxsize=1000 if cache_size is None else cache_size)
+        self._batch_request_id = itertools.count()
+        self._batch_request_id_lock = threading.Lock()
+
+    def make_request(self, method, params):
+        if method not in _immutable_methods:
+            return self._make_request(method, params)
+
+        key = (method, json.dumps(params, sort_keys=True, default=str))
+        response = self._cache.get(key)
+        if response is None:
+            response = self._make_request(method, params)
+            if response.get('result') is not None:
+                self._cache.set(key, response)
+        return copy.deepcopy(response)
+
+    # requests: [(method, params)] 結果(result)をrequestsの順で返す
+    # どれかがエラーならValueError
+    def make_batch_request(self, requests_list):
+        with self._batch_request_id_lock:
+            ids = [next(self._batch_request_id) for _ in requests_list]
+        body = [
+            {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': request_id}
+            for request_id, (method, params) in zip(ids, requests_list)
+        ]
+        self.logger.debug('Making batch request HTTP. URI: %s, Methods: %s',
+                          self.endpoint_uri, [method for method, _ in requests_list])
+
+        # batchに対応していないnodeはエラーのobjectを一つだけ返す
+        decoded = json.loads(self._post(json.dumps(body)))
+        if not isinstance(decoded, list):
+            raise ValueError('batch request not supported {}'.format(decoded))
+        responses = {x.get('id'): x for x in decoded if isinstance(x, dict)}
+        results = []
+        for request_id in ids:
+            x = responses.get(request_id)
+            if x is None or 'error' in x:
+                raise ValueError(x['error'] if x is not None else 'missing batch response')
+            results.append(x['result'])
+        return results
+
+    def _make_request(self, method, params):
+        self.logger.debug('Making request HTTP. URI: %s, Method: %s', self.endpoint_uri, method)
+        raw_response = self._post(self.encode_rpc_request(method, params))
+        return self.decode_rpc_response(raw_response)
+
+    def _post(self, data):
+        response = self._session.post(self.endpoint_uri, data=data, **self.get_request_kwargs())
+        response.raise_for_status()
+        return response.content
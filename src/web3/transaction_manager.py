@@ -0,0 +1,143 @@
+import threading
+import time
+from web3.exceptions import TimeExhausted
+from ..logger import create_null_logger
+
+
+# トランザクションの送信(send)と確定待ち(wait)を分ける
+# nonceはローカルで管理するので、確定を待たずに複数のトランザクションを送れる
+# feeはfee_cache_sec秒キャッシュする
+# thread safe
+
+class TransactionManager:
+    def __init__(self, w3, rate_limit_func=None, gas_buffer=None, max_priority_fee_scale=None,
+                 fee_cache_sec=None, logger=None):
+        self._w3 = w3
+        self._rate_limit_func = (lambda: ...) if rate_limit_func is None else rate_limit_func
+        self._gas_buffer = gas_buffer
+        self._max_priority_fee_scale = max_priority_fee_scale
+        self._fee_cache_sec = 10 if fee_cache_sec is None else fee_cache_sec
+        self._logger = create_null_logger() if logger is None else logger
+        self._lock = threading.Lock()
+        self._nonce = None
+        self._fee = None
+        self._fee_fetched_at = 0
+        self._batch_request_disabled = False
+
+    def transact(self, func, options):
+        return self.wait(self.send(func, options))
+
+    def send(self, func, options):
+        default_account = self._w3.eth.default_account
+
+        if not hasattr(default_account, 'key'):
+            # remote private key (nonceはnodeが管理する)
+            self._rate_limit_func()
+            return func.transact(options)
+
+        # local private key (not work with hardhat https://github.com/nomiclabs/hardhat/issues/1664)
+        with self._lock:
+            self._prefetch(default_account.address)
+            options = {
+                **options,
+                'nonce': self._get_nonce(default_account.address),
+            }
+            if self._max_priority_fee_scale is not None:
+                options = {
+                    **options,
+                    **self._get_fee_options(),
+                }
+            if self._gas_buffer is not None:
+                self._rate_limit_func()
+                options = {
+                    **options,
+                    'gas': func.estimateGas(options) + self._gas_buffer,
+                }
+
+            tx = func.buildTransaction(options)
+            signed_tx = self._w3.eth.account.sign_transaction(tx, private_key=default_account.key)
+            try:
+                self._rate_limit_func()
+                self._w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            except Exception:
+                # nonceがずれている可能性があるので次回取り直す
+                self._nonce = None
+                raise
+
+            self._nonce += 1
+            self._logger.debug('TransactionManager.send nonce {} tx_hash {}'.format(
+                options['nonce'], signed_tx.hash.hex()))
+            return signed_tx.hash
+
+    def wait(self, tx_hash):
+        try:
+            receipt = self._w3.eth.wait_for_transaction_receipt(tx_hash)
+        except TimeExhausted:
+            # 取り込まれなかった可能性があるので次回nonceを取り直す
+            with self._lock:
+                self._nonce = None
+            raise
+
+        if receipt['status'] == 0:
+            raise Exception('transaction failed {}'.format(dict(receipt)))
+
+        # wait for block number
+        self._rate_limit_func()
+        while self._w3.eth.block_number < receipt['blockNumber']:
+            time.sleep(1)
+            self._rate_limit_func()
+
+        return receipt
+
+    # nonceとfeeの両方が必要なときは、providerが対応していれば一回のbatch requestで取る
+    def _prefetch(self, address):
+        make_batch_request = getattr(self._w3.provider, 'make_batch_request', None)
+        if make_batch_request is None or self._batch_request_disabled or self._nonce is not None:
+            return
+        if self._max_priority_fee_scale is None or not self._is_fee_expired(time.time()):
+            return
+
+        self._rate_limit_func()
+        try:
+            nonce, max_priority_fee, block = make_batch_request([
+                ('eth_getTransactionCount', [address, 'pending']),
+                ('eth_maxPriorityFeePerGas', []),
+                ('eth_getBlockByNumber', ['latest', False]),
+            ])
+            nonce = int(nonce, 16)
+            fee = (int(max_priority_fee, 16), int(block['baseFeePerGas'], 16))
+        except Exception as e:
+            # batchが使えない場合は以降_get_nonce, _get_fee_optionsで個別に取得する
+            self._logger.warn('TransactionManager._prefetch batch request failed. disabled {}'.format(e))
+            self._batch_request_disabled = True
+            return
+
+        self._nonce = nonce
+        self._fee = fee
+        self._fee_fetched_at = time.time()
+
+    def _is_fee_expired(self, now):
+        return self._fee is None or now - self._fee_fetched_at >= self._fee_cache_sec
+
+    def _get_nonce(self, address):
+        if self._nonce is None:
+            self._rate_limit_func()
+            self._nonce = self._w3.eth.get_transaction_count(address, 'pending')
+        return self._nonce
+
+    def _get_fee_options(self):
+        now = time.time()
+        if self._is_fee_expired(now):
+            self._rate_limit_func()
+            max_priority_fee = self._w3.eth.max_priority_fee
+            self._rate_limit_func()
+            base_fee = self._w3.eth.get_block('latest')['baseFeePerGas']
+            self._fee = (max_priority_fee, base_fee)
+            self._fee_fetched_at = now
+
+        max_priority_fee, base_fee = self._fee
+        max_priority_fee_per_gas = int(self._max_priority_fee_scale * max_priority_fee)
+        return {
+            'maxFeePerGas': max_priority_fee_per_gas + 2 * base_fee,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+        }
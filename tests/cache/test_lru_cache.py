@@ -0,0 +1,32 @@
+from unittest import TestCase
+from src.cache import LruCache
+
+
+class TestLruCache(TestCase):
+    def test_get_set(self):
+        cache = LruCache(maxsize=2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 1), 1)
+
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertTrue('a' in cache)
+        self.assertEqual(len(cache), 1)
+
+    def test_evict(self):
+        cache = LruCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        cache = LruCache(maxsize=2)
+        cache.set('a', 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,33 @@
+from unittest import TestCase
+from src.cache import TtlCache
+
+
+class TestTtlCache(TestCase):
+    def test_get_set(self):
+        now = 100
+        cache = TtlCache(time_func=lambda: now)
+        self.assertIsNone(cache.get('a'))
+
+        cache.set('a', 1, expire_at=110)
+        self.assertEqual(cache.get('a'), 1)
+
+        now = 110
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_already_expired(self):
+        cache = TtlCache(time_func=lambda: 100)
+        cache.set('a', 1, expire_at=100)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_purge_on_set(self):
+        now = 100
+        cache = TtlCache(time_func=lambda: now)
+        cache.set('a', 1, expire_at=110)
+        cache.set('b', 2, expire_at=120)
+
+        now = 115
+        cache.set('c', 3, expire_at=130)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('b'), 2)
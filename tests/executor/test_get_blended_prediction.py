@@ -1,5 +1,4 @@
 import pandas as pd
-from pandas.testing import assert_frame_equal
 from unittest.mock import MagicMock, patch
 from ..helpers import (
     create_web3,
@@ -17,6 +16,8 @@ from ..helpers import (
     BaseHardhatTestCase
 )
 from src.executor.executor import Executor
+from src.executor.symbol_universe import SymbolUniverse
+from src.executor.utils import blend_prediction_vector, fetch_current_predictions
 from src.store.event_indexer import EventIndexer
 from src.model_selection.all_model_selector import AllModelSelector
 
@@ -27,6 +28,25 @@ model_id = 'model1'
 evaluation_periods = 5
 
 
+def blend_prediction(executor, execution_start_at, without_fetch_events=False):
+    df_current = fetch_current_predictions(
+        store=executor._store,
+        tournament_id=get_tournament_id(),
+        execution_start_at=execution_start_at,
+        without_fetch_events=without_fetch_events,
+    )
+    symbol_universe = SymbolUniverse()
+    blended = blend_prediction_vector(
+        df_weight=executor._calc_weight(execution_start_at),
+        df_current=df_current,
+        symbol_universe=symbol_universe,
+    )
+    if blended is None:
+        return {}
+    df = symbol_universe.to_df(*blended)
+    return df['position'].to_dict()
+
+
 class TestExecutorGetBlendedPrediction(BaseHardhatTestCase):
     def setUp(self):
         super().setUp()
@@ -74,43 +94,17 @@ class TestExecutorGetBlendedPrediction(BaseHardhatTestCase):
         proceed_time(w3, executor_time)
 
     def test_ok(self):
-        df = self.executor._get_blended_prediction(
-            execution_start_at=execution_start_at
-        )
-
-        expected = pd.DataFrame([
-            ['BTC', 0.5],
-        ], columns=['symbol', 'position']).set_index('symbol')
-
-        assert_frame_equal(df, expected)
+        self.assertEqual(blend_prediction(self.executor, execution_start_at), {'BTC': 0.5})
 
     def test_without_fetch_events(self):
         # fetch events
-        self.executor._get_blended_prediction(
-            execution_start_at=execution_start_at
-        )
+        blend_prediction(self.executor, execution_start_at)
 
         with patch.object(EventIndexer, '_fetch_events') as mocked_fetch_events:
-            df = self.executor._get_blended_prediction(
-                execution_start_at=execution_start_at,
-                without_fetch_events=True
-            )
+            blended = blend_prediction(self.executor, execution_start_at, without_fetch_events=True)
             mocked_fetch_events.assert_not_called()
 
-        expected = pd.DataFrame([
-            ['BTC', 0.5],
-        ], columns=['symbol', 'position']).set_index('symbol')
-
-        assert_frame_equal(df, expected)
+        self.assertEqual(blended, {'BTC': 0.5})
 
     def test_different_execution_start_at(self):
-        df = self.executor._get_blended_prediction(
-            execution_start_at=execution_start_at + 1
-        )
-
-        expected = pd.DataFrame(
-            [],
-            columns=['symbol', 'position']
-        ).set_index('symbol')
-
-        assert_frame_equal(df, expected)
+        self.assertEqual(blend_prediction(self.executor, execution_start_at + 1), {})
@@ -0,0 +1,122 @@
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from unittest import TestCase
+from unittest.mock import MagicMock
+from src.executor.model_selection_panel import ModelSelectionPanel
+from src.executor.utils import create_model_selection_params, fetch_historical_predictions
+from src.logger import create_null_logger
+
+symbols = ['BTC', 'ETH']
+
+
+def create_content(i, model_index):
+    if (i + model_index) % 3 == 0:
+        return 'symbol,position\nBTC,0.{}\nXRP,0.1'.format(model_index + 1).encode()
+    return 'symbol,position\nBTC,0.{}\nETH,-0.{}'.format(model_index + 1, i % 5).encode()
+
+
+class TestExecutorModelSelectionPanel(TestCase):
+    def setUp(self):
+        self.fetched = []
+        self.market_rounds = set(range(20))
+        self.revision = 1
+        self.undecryptable = set()
+
+        store = MagicMock()
+        store.fetch_predictions_range.side_effect = self.fetch_predictions_range
+        store.fetch_event_revision.side_effect = lambda: self.revision
+        self.store = store
+
+        market_data_store = MagicMock()
+        market_data_store.fetch_df_market.side_effect = self.fetch_df_market
+        self.market_data_store = market_data_store
+
+        self.panel = ModelSelectionPanel(
+            store=store,
+            tournament_id='crypto_daily',
+            market_data_store=market_data_store,
+            symbols=symbols,
+        )
+
+    def fetch_predictions_range(self, tournament_id, execution_start_ats, without_fetch_events=False):
+        self.fetched.append(list(execution_start_ats))
+        rows = []
+        for x in execution_start_ats:
+            # model2はラウンド6まで、model3はラウンド5から
+            for model_index, model_id in enumerate(['model1', 'model2', 'model3']):
+                if (model_id == 'model2' and x > 6) or (model_id == 'model3' and x < 5):
+                    continue
+                rows.append(dict(
+                    model_id=model_id,
+                    execution_start_at=x,
+                    content=None if (model_id, x) in self.undecryptable else create_content(x, model_index),
+                ))
+        return pd.DataFrame(rows, columns=['model_id', 'execution_start_at', 'content'])
+
+    def fetch_df_market(self, symbols):
+        return pd.DataFrame([
+            [x, symbol, 0.01 * x + 0.1 * i]
+            for x in sorted(self.market_rounds)
+            for i, symbol in enumerate(symbols)
+        ], columns=['execution_start_at', 'symbol', 'ret']).set_index(['execution_start_at', 'symbol'])
+
+    def assert_same_as_full(self, execution_start_ats):
+        df_ret, df_position = self.panel.fetch(execution_start_ats)
+
+        store = MagicMock()
+        store.fetch_predictions_range.side_effect = self.fetch_predictions_range
+        df = fetch_historical_predictions(store, 'crypto_daily', execution_start_ats, create_null_logger())
+        df_current = pd.DataFrame(
+            index=pd.Index(df.index.get_level_values('model_id').unique(), name='model_id'))
+        expected = create_model_selection_params(
+            df=df,
+            df_current=df_current,
+            df_market=self.fetch_df_market(symbols),
+            execution_start_ats=execution_start_ats,
+            symbols=symbols,
+        )
+        assert_frame_equal(df_ret, expected.df_ret)
+        assert_frame_equal(df_position, expected.df_position)
+
+    def test_rolling(self):
+        for i in range(12):
+            self.assert_same_as_full(list(range(i, i + 4)))
+
+    def test_fetch_only_new_round(self):
+        self.panel.fetch([0, 1, 2, 3])
+        self.panel.fetch([1, 2, 3, 4])
+
+        self.assertEqual(self.fetched, [[0, 1, 2, 3], [4]])
+        self.assertEqual(self.market_data_store.fetch_df_market.call_count, 2)
+
+        self.panel.fetch([1, 2, 3, 4])
+        self.assertEqual(self.market_data_store.fetch_df_market.call_count, 2)
+
+    def test_refetch_round_without_ret(self):
+        self.market_rounds = {0, 1, 2}
+        self.panel.fetch([0, 1, 2, 3])
+
+        self.market_rounds = {0, 1, 2, 3}
+        self.fetched = []
+        self.assert_same_as_full([0, 1, 2, 3])
+        self.assertEqual(self.fetched[0], [3])
+
+    def test_refetch_undecryptable_round_on_new_events(self):
+        self.undecryptable = {('model1', 3)}
+        df_ret, df_position = self.panel.fetch([0, 1, 2, 3])
+        self.assertTrue(df_position.loc[3, 'model1'].isna().all())
+
+        self.fetched = []
+        self.panel.fetch([0, 1, 2, 3])
+        self.assertEqual(self.fetched, [])
+
+        # 鍵が届いてイベントが更新された
+        self.undecryptable = set()
+        self.revision = 2
+        self.assert_same_as_full([0, 1, 2, 3])
+        self.assertEqual(self.fetched[0], [3])
+
+        self.fetched = []
+        self.revision = 3
+        self.panel.fetch([0, 1, 2, 3])
+        self.assertEqual(self.fetched, [])
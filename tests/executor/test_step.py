@@ -1,5 +1,4 @@
 import pandas as pd
-from pandas.testing import assert_frame_equal
 from unittest.mock import MagicMock
 from ..helpers import (
     create_web3,
@@ -17,12 +16,33 @@ from ..helpers import (
     BaseHardhatTestCase
 )
 from src.executor.executor import Executor
+from src.executor.symbol_universe import SymbolUniverse
+from src.executor.utils import blend_prediction_vector, fetch_current_predictions
 from src.web3 import get_account_address
 from src.model_selection.all_model_selector import AllModelSelector
 
 day_seconds = 24 * 60 * 60
 evaluation_periods = 5
 
+
+def blend_prediction(executor, execution_start_at, without_fetch_events=False):
+    df_current = fetch_current_predictions(
+        store=executor._store,
+        tournament_id=get_tournament_id(),
+        execution_start_at=execution_start_at,
+        without_fetch_events=without_fetch_events,
+    )
+    symbol_universe = SymbolUniverse()
+    blended = blend_prediction_vector(
+        df_weight=executor._calc_weight(execution_start_at),
+        df_current=df_current,
+        symbol_universe=symbol_universe,
+    )
+    if blended is None:
+        return {}
+    df = symbol_universe.to_df(*blended)
+    return df['position'].to_dict()
+
 class TestExecutorStep(BaseHardhatTestCase):
     def test_ok(self):
         w3 = create_web3()
@@ -119,19 +139,12 @@ class TestExecutorStep(BaseHardhatTestCase):
         sendings = event_indexer_purchaser.fetch_prediction_key_sendings()
         self.assertFalse(pd.isna(sendings.iloc[0]['encrypted_content_key']))
 
-        # get_blended_prediction (before preparation)
-        blended_prediction = executor._get_blended_prediction(execution_start_at=execution_start_at)
-        expected = pd.DataFrame([
-        ], columns=['symbol', 'position']).set_index('symbol')
-        assert_frame_equal(blended_prediction, expected)
+        # blend_prediction (before preparation)
+        self.assertEqual(blend_prediction(executor, execution_start_at), {})
 
-        # get_blended_prediction (after preparation)
+        # blend_prediction (after preparation)
         executor_time = execution_start_at + get_preparation_time_shift() + buffer_time
-        blended_prediction = executor._get_blended_prediction(execution_start_at=execution_start_at)
-        expected = pd.DataFrame([
-            ['BTC', 0.5],
-        ], columns=['symbol', 'position']).set_index('symbol')
-        assert_frame_equal(blended_prediction, expected)
+        self.assertEqual(blend_prediction(executor, execution_start_at), {'BTC': 0.5})
 
     def test_empty(self):
         df_market = pd.DataFrame(
@@ -166,10 +179,5 @@ class TestExecutorStep(BaseHardhatTestCase):
         proceed_time(w3_purchaser, executor_time)
         executor._step()
 
-        # get_blended_prediction
-        blended_prediction = executor._get_blended_prediction(execution_start_at=execution_start_at)
-        expected = pd.DataFrame(
-            [],
-            columns=['symbol', 'position']
-        ).set_index('symbol')
-        assert_frame_equal(blended_prediction, expected)
+        # blend_prediction
+        self.assertEqual(blend_prediction(executor, execution_start_at), {})
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from unittest import TestCase
+from src.executor.symbol_universe import SymbolUniverse
+
+
+class TestExecutorSymbolUniverse(TestCase):
+    def test_indices(self):
+        symbol_universe = SymbolUniverse(['ETH', 'BTC'])
+
+        self.assertEqual(symbol_universe.indices(['BTC', 'XRP', 'ETH']).tolist(), [1, 2, 0])
+        self.assertEqual(symbol_universe.indices(['XRP']).tolist(), [2])
+        self.assertEqual(len(symbol_universe), 3)
+        self.assertEqual(symbol_universe.symbols(), ['ETH', 'BTC', 'XRP'])
+
+    def test_to_df(self):
+        symbol_universe = SymbolUniverse(['XRP', 'ETH', 'BTC'])
+
+        df = symbol_universe.to_df(np.array([0.1, 0.2, 0.3]), np.array([True, False, True]))
+
+        expected = pd.DataFrame([
+            ['BTC', 0.3],
+            ['XRP', 0.1],
+        ], columns=['symbol', 'position']).set_index('symbol')
+        assert_frame_equal(df, expected)
@@ -0,0 +1,114 @@
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from src.executor.executor import Executor
+from src.executor.utils import (
+    blend_predictions,
+    blend_prediction_vector,
+    calc_target_positions,
+    floor_to_execution_start_at,
+)
+
+tournament = dict(
+    execution_start_at=0,
+    prediction_time=4 * 60,
+    sending_time=4 * 60,
+    execution_preparation_time=4 * 60,
+    execution_time=4 * 60 * 60,
+)
+day_seconds = 24 * 60 * 60
+timestamp = 10 * day_seconds + 30 * 60
+
+
+class TestExecutorTargetPositionSurface(TestCase):
+    def setUp(self):
+        self.revision = 1
+        self.contents = {}
+
+        store = MagicMock()
+        store.fetch_tournament.return_value = tournament
+        store.fetch_event_revision.side_effect = lambda: self.revision
+        store.fetch_predictions_range.side_effect = self.fetch_predictions_range
+        self.store = store
+
+        self.executor = Executor(
+            store=store,
+            tournament_id='crypto_daily',
+            symbol_white_list=['BTC', 'ETH'],
+        )
+        self.df_weight = pd.DataFrame([
+            ['model1', 0.5],
+            ['model2', 0.5],
+        ], columns=['model_id', 'weight']).set_index('model_id')
+        self.executor._calc_weight = lambda x: self.df_weight
+
+    def fetch_predictions_range(self, tournament_id, execution_start_ats, without_fetch_events=False):
+        rows = []
+        for x in execution_start_ats:
+            for model_id in ['model1', 'model2']:
+                content = self.contents.get((model_id, x), b'symbol,position\nBTC,0.2\nETH,-0.1')
+                rows.append(dict(model_id=model_id, execution_start_at=x, owner='owner', content=content))
+        return pd.DataFrame(rows, columns=['model_id', 'execution_start_at', 'owner', 'content'])
+
+    def expected(self, timestamp):
+        execution_start_at, t = floor_to_execution_start_at(timestamp, tournament)
+        execution_start_ats = [
+            execution_start_at - tournament['execution_time'] * i
+            for i in reversed(range(day_seconds // tournament['execution_time'] + 1))
+        ]
+        predictions = self.fetch_predictions_range(None, execution_start_ats)
+        df_blended_list = [
+            blend_predictions(
+                df_weight=self.df_weight,
+                df_current=predictions.loc[predictions['execution_start_at'] == x].set_index('model_id'),
+            )
+            for x in execution_start_ats
+        ]
+        return calc_target_positions(t, df_blended_list), execution_start_ats
+
+    def test_cached(self):
+        df = self.executor.get_target_positions(timestamp)
+        df2 = self.executor.get_target_positions(timestamp + 60)
+
+        assert_frame_equal(df, self.expected(timestamp)[0])
+        assert_frame_equal(df2, self.expected(timestamp + 60)[0])
+        self.assertEqual(self.store.fetch_predictions_range.call_count, 1)
+
+    def test_revision_changed(self):
+        _, execution_start_ats = self.expected(timestamp)
+        self.executor.get_target_positions(timestamp)
+
+        self.revision = 2
+        self.contents[('model1', execution_start_ats[-1])] = b'symbol,position\nBTC,0.4'
+        with patch('src.executor.executor.blend_prediction_vector', wraps=blend_prediction_vector) as mocked_blend:
+            df = self.executor.get_target_positions(timestamp)
+
+        assert_frame_equal(df, self.expected(timestamp)[0])
+        self.assertEqual(self.store.fetch_predictions_range.call_count, 2)
+        self.assertEqual(mocked_blend.call_count, 1)
+
+    def test_weight_changed(self):
+        self.executor.get_target_positions(timestamp)
+
+        self.df_weight = pd.DataFrame([
+            ['model1', 1.0],
+        ], columns=['model_id', 'weight']).set_index('model_id')
+        df = self.executor.get_target_positions(timestamp)
+
+        assert_frame_equal(df, self.expected(timestamp)[0])
+        self.assertEqual(self.store.fetch_predictions_range.call_count, 2)
+
+    def test_compact_symbol_universe(self):
+        self.executor._max_symbol_count = 3
+        _, execution_start_ats = self.expected(timestamp)
+        self.contents[('model2', execution_start_ats[-1])] = b'symbol,position\nBTC,0.2\nJUNK1,0.1\nJUNK2,0.1'
+        df = self.executor.get_target_positions(timestamp)
+        assert_frame_equal(df, self.expected(timestamp)[0])
+
+        self.revision = 2
+        del self.contents[('model2', execution_start_ats[-1])]
+        df = self.executor.get_target_positions(timestamp)
+
+        assert_frame_equal(df, self.expected(timestamp)[0])
+        self.assertEqual(self.executor._symbol_universe.symbols(), ['BTC', 'ETH'])
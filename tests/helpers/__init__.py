@@ -54,13 +54,14 @@ def create_redis_client(namespace=None):
 
 
 def create_store(w3, contract, redis_namespace=None, network_name=None,
-                 start_block_number=None):
+                 start_block_number=None, decrypt_concurrency=None):
     return Store(
         w3, contract,
         chain_id=get_chain_id(network_name=network_name),
         redis_client=create_redis_client(namespace=redis_namespace),
         logger=get_logger(),
         start_block_number=start_block_number,
+        decrypt_concurrency=decrypt_concurrency,
     )
 
 
@@ -0,0 +1,22 @@
+from concurrent.futures import Future
+from unittest import TestCase
+from unittest.mock import MagicMock
+from src.logger import check_futures
+
+
+class TestCheckFutures(TestCase):
+    def test_ok(self):
+        pending = Future()
+        failed = Future()
+        failed.set_exception(ValueError('failed'))
+        partial = Future()
+        partial.set_result({'failures': [{'error': 'batch failed'}]})
+        succeeded = Future()
+        succeeded.set_result({})
+        logger = MagicMock()
+
+        futures = check_futures([pending, failed, partial, succeeded], logger)
+
+        self.assertEqual(futures, [pending])
+        self.assertEqual(logger.error.call_count, 2)
+        self.assertEqual(logger.error.call_args_list[1][0][0], 'batch failed')
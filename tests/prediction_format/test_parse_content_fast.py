@@ -0,0 +1,65 @@
+from unittest import TestCase
+from unittest.mock import patch
+from pandas.testing import assert_frame_equal
+from src.prediction_format import (
+    validate_content,
+    normalize_content,
+    parse_content,
+    validate_and_normalize_content,
+    ValidationError,
+    _parse_content_fast,
+)
+
+
+def validate_pandas(content):
+    with patch('src.prediction_format._parse_content_fast', return_value=None):
+        try:
+            validate_content(content)
+        except ValidationError as e:
+            return str(e)
+        return None
+
+
+class TestPredictionFormatParseContentFast(TestCase):
+    def test_same_as_pandas(self):
+        contents = [
+            b'symbol,position\nETH,0.2\nBTC,-0.1',
+            b'position,symbol\n.5,XRP\n+1e-3,BTC\n',
+            b'symbol,position\nBTC,00.1\n0123,0.3',
+        ]
+        for content in contents:
+            self.assertIsNotNone(_parse_content_fast(content))
+            with patch('src.prediction_format._parse_content_fast', return_value=None):
+                expected_normalized = normalize_content(content)
+                expected_df = parse_content(content)
+
+            normalized, df = validate_and_normalize_content(content)
+            self.assertEqual(normalized, expected_normalized)
+            self.assertEqual(normalize_content(content), expected_normalized)
+            assert_frame_equal(df, expected_df)
+            assert_frame_equal(parse_content(content), expected_df)
+
+    def test_fallback(self):
+        contents = [
+            b'symbol,position\nBTC,0.1\nBTC,0.2',
+            b'symbol,position\nBTC,inf',
+            b'symbol,position\nNA,0.1',
+            b'symbol,position\nBTC,0.6\nETH,0.40001',
+            b'symbol,position\nBTC,0.6\nETH,0.4000099999',
+            b'symbol,position\n\nBTC,0.1',
+            b'symbol,position\n"BTC",0.1',
+            b'symbol,position\r\nBTC,0.1',
+            b'symbol,position,x\nBTC,0.1,1',
+            b'symbol,position\nBTC-USD,0.1',
+            b'symbol,position',
+        ]
+        for content in contents:
+            self.assertIsNone(_parse_content_fast(content), content)
+
+            expected = validate_pandas(content)
+            try:
+                validate_content(content)
+                error = None
+            except ValidationError as e:
+                error = str(e)
+            self.assertEqual(error, expected, content)
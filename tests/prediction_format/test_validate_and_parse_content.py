@@ -0,0 +1,40 @@
+from unittest import TestCase
+from unittest.mock import patch
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from src.prediction_format import validate_and_parse_content, ValidationError, _parse_content_fast
+import src.prediction_format
+
+
+class TestPredictionFormatValidateAndParseContent(TestCase):
+    def setUp(self):
+        src.prediction_format._parsed_content_cache.clear()
+
+    def test_cached(self):
+        content = b"""symbol,position
+ETH,0.2
+BTC,0.1"""
+        expected = pd.DataFrame([
+            ['BTC', 0.1],
+            ['ETH', 0.2],
+        ], columns=['symbol', 'position']).set_index('symbol')
+
+        with patch('src.prediction_format._parse_content_fast', wraps=_parse_content_fast) as mocked_parse:
+            df = validate_and_parse_content(content)
+            df['position'] *= 2
+            df2 = validate_and_parse_content(content)
+
+        assert_frame_equal(df2, expected)
+        self.assertEqual(mocked_parse.call_count, 1)
+
+    def test_invalid_cached(self):
+        content = b"""symbol,position
+BTC,0.1
+BTC,0.2"""
+        for _ in range(2):
+            with self.assertRaisesRegex(ValidationError, 'duplicated symbol'):
+                validate_and_parse_content(content)
+
+    def test_not_bytes(self):
+        with self.assertRaisesRegex(ValidationError, 'decode failed'):
+            validate_and_parse_content(float('nan'))
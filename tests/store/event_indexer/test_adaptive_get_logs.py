@@ -0,0 +1,91 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from src.store.event_indexer import EventIndexer
+
+
+def create_event(block_number, tournament_id):
+    return {
+        'event': 'TournamentCreated',
+        'blockNumber': block_number,
+        'logIndex': 0,
+        'blockHash': b'\x00' * 32,
+        'args': {
+            'tournamentId': tournament_id,
+            'executionStartAt': 30 * 60,
+        },
+    }
+
+
+class TestEventIndexerAdaptiveGetLogs(TestCase):
+    def create_event_indexer(self, block_number):
+        w3 = MagicMock()
+        w3.eth.block_number = block_number
+        return EventIndexer(
+            w3, MagicMock(),
+            get_logs_limit=100,
+            max_get_logs_window=8,
+        )
+
+    def test_sparse(self):
+        event_indexer = self.create_event_indexer(10000)
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = lambda contract, from_block, to_block, event_names: (
+                [create_event(5000, 't1')] if from_block <= 5000 <= to_block else []
+            )
+            df = event_indexer.fetch_tournaments()
+
+        self.assertEqual(df['tournament_id'].tolist(), ['t1'])
+        self.assertEqual(event_indexer._last_block_number, 10000)
+        self.assertLess(mocked_get_events.call_count, 100)
+
+        # covers all blocks exactly once
+        ranges = sorted(
+            (call.kwargs['from_block'], call.kwargs['to_block'])
+            for call in mocked_get_events.call_args_list
+        )
+        self.assertEqual(ranges[0][0], 1)
+        self.assertEqual(ranges[-1][1], 10000)
+        for prev, cur in zip(ranges, ranges[1:]):
+            self.assertEqual(prev[1] + 1, cur[0])
+
+    def test_bisect(self):
+        event_indexer = self.create_event_indexer(1000)
+        event_indexer._get_logs_window = 8
+
+        def get_events(contract, from_block, to_block, event_names):
+            if to_block - from_block + 1 > 50:
+                raise ValueError({'code': -32005, 'message': 'query returned more than 10000 results'})
+            return [
+                create_event(block_number, 't{}'.format(block_number))
+                for block_number in [10, 420]
+                if from_block <= block_number <= to_block
+            ]
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = get_events
+            df = event_indexer.fetch_tournaments()
+
+        self.assertEqual(df['tournament_id'].tolist(), ['t10', 't420'])
+        self.assertEqual(event_indexer._last_block_number, 1000)
+        self.assertLess(event_indexer._get_logs_window, 8)
+
+    def test_other_error(self):
+        event_indexer = self.create_event_indexer(1000)
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = ValueError('execution reverted')
+            with self.assertRaises(ValueError):
+                event_indexer.fetch_tournaments()
+            self.assertEqual(mocked_get_events.call_count, 1)
+
+        self.assertEqual(event_indexer._last_block_number, 0)
+
+    def test_rate_limit_error(self):
+        event_indexer = self.create_event_indexer(1000)
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = ValueError({'code': 429, 'message': 'rate limit exceeded'})
+            with self.assertRaises(ValueError):
+                event_indexer.fetch_tournaments()
+            self.assertEqual(mocked_get_events.call_count, 1)
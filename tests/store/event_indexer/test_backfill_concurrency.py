@@ -0,0 +1,46 @@
+import random
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from src.store.event_indexer import EventIndexer
+
+
+class TestEventIndexerBackfillConcurrency(TestCase):
+    def test_ok(self):
+        w3 = MagicMock()
+        w3.eth.block_number = 1000
+        event_indexer = EventIndexer(
+            w3, MagicMock(),
+            get_logs_limit=10,
+            max_get_logs_window=1,
+            backfill_concurrency=4,
+        )
+
+        def get_events(contract, from_block, to_block, event_names):
+            time.sleep(random.random() * 0.01)
+            return [
+                {
+                    'event': 'PublicKeyChanged',
+                    'blockNumber': block_number,
+                    'logIndex': 0,
+                    'blockHash': b'\x00' * 32,
+                    'args': {'owner': 'owner1', 'publicKey': block_number},
+                }
+                for block_number in range(from_block, to_block + 1)
+            ]
+
+        processed = []
+        process_event = event_indexer._process_event
+
+        def mocked_process_event(event):
+            processed.append(event['blockNumber'])
+            return process_event(event)
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = get_events
+            with patch.object(event_indexer, '_process_event', mocked_process_event):
+                df = event_indexer.fetch_public_keys()
+
+        self.assertEqual(mocked_get_events.call_count, 100)
+        self.assertEqual(processed, list(range(1, 1001)))
+        self.assertEqual(df['public_key'].tolist(), [1000])
@@ -0,0 +1,89 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from src.store.event_indexer import EventIndexer
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append('get')
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.commands.append('mget')
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.commands.append('set')
+        self.data[key] = value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._data = {}
+
+    def set(self, key, value):
+        self._data[key] = value
+
+    def execute(self):
+        self._redis.commands.append('pipeline')
+        self._redis.data.update(self._data)
+
+
+def get_events(contract, from_block, to_block, event_names):
+    return [
+        {
+            'event': 'PublicKeyChanged',
+            'blockNumber': block_number,
+            'logIndex': 0,
+            'blockHash': b'\x00' * 32,
+            'args': {'owner': 'owner1', 'publicKey': block_number},
+        }
+        for block_number in range(from_block, to_block + 1, 5)
+    ]
+
+
+class TestEventIndexerRedisPipeline(TestCase):
+    def create_event_indexer(self, redis_client):
+        w3 = MagicMock()
+        w3.eth.block_number = 100
+        return EventIndexer(
+            w3, MagicMock(),
+            redis_client=redis_client,
+            get_logs_limit=10,
+            max_get_logs_window=4,
+        )
+
+    def test_ok(self):
+        redis_client = FakeRedis()
+        event_indexer = self.create_event_indexer(redis_client)
+        redis_client.commands = []
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = get_events
+            df = event_indexer.fetch_public_keys()
+
+        # chunkはmget一回で読み、取得したグループごとにpipelineで書く
+        self.assertEqual(redis_client.commands[0], 'mget')
+        self.assertEqual(redis_client.commands.count('mget'), 1)
+        self.assertEqual(redis_client.commands.count('pipeline'), mocked_get_events.call_count)
+        self.assertNotIn('get', redis_client.commands)
+        self.assertEqual(len([key for key in redis_client.data if key.startswith('event_indexer:')]), 10)
+        self.assertEqual(df['public_key'].tolist(), [96])
+
+        # snapshotを使わずにchunkのキャッシュから復元する
+        redis_client.data.pop('event_indexer_snapshot', None)
+        redis_client.commands = []
+        event_indexer = self.create_event_indexer(redis_client)
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            df = event_indexer.fetch_public_keys()
+            mocked_get_events.assert_not_called()
+        self.assertEqual(df['public_key'].tolist(), [96])
+        self.assertEqual(redis_client.commands.count('mget'), 1)
@@ -0,0 +1,101 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from src.store.event_indexer import EventIndexer
+
+
+class Chain:
+    def __init__(self):
+        self.blocks = {}
+
+    def set_block(self, block_number, fork, events=None):
+        self.blocks[block_number] = {
+            'hash': '{}:{}'.format(fork, block_number).encode(),
+            'events': [] if events is None else events,
+        }
+
+    def block_number(self):
+        return max(self.blocks)
+
+    def get_block(self, block_number):
+        return {'hash': self.blocks[block_number]['hash']}
+
+    def get_events(self, contract, from_block, to_block, event_names):
+        events = []
+        for block_number in range(from_block, to_block + 1):
+            for log_index, (event_name, args) in enumerate(self.blocks[block_number]['events']):
+                events.append({
+                    'event': event_name,
+                    'blockNumber': block_number,
+                    'logIndex': log_index,
+                    'blockHash': self.blocks[block_number]['hash'],
+                    'args': args,
+                })
+        return events
+
+
+def model_created(model_id):
+    return 'ModelCreated', {'modelId': model_id, 'tournamentId': 't1', 'owner': 'owner1'}
+
+
+def public_key_changed(public_key):
+    return 'PublicKeyChanged', {'owner': 'owner1', 'publicKey': public_key}
+
+
+class TestEventIndexerReorg(TestCase):
+    def setUp(self):
+        chain = Chain()
+        for block_number in range(1, 11):
+            chain.set_block(block_number, 'a')
+        chain.set_block(2, 'a', [model_created('model1')])
+        chain.set_block(3, 'a', [public_key_changed(b'key1')])
+        chain.set_block(8, 'a', [model_created('model2')])
+        chain.set_block(9, 'a', [public_key_changed(b'key2')])
+        self.chain = chain
+
+        w3 = MagicMock()
+        type(w3.eth).block_number = property(lambda _: chain.block_number())
+        w3.eth.get_block.side_effect = chain.get_block
+        self.event_indexer = EventIndexer(
+            w3, MagicMock(),
+            get_logs_limit=4,
+            confirmation_blocks=5,
+        )
+
+    def fetch(self):
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            mocked_get_events.side_effect = self.chain.get_events
+            models = self.event_indexer.fetch_models()
+            public_keys = self.event_indexer.fetch_public_keys(without_fetch_events=True)
+        return models, public_keys
+
+    def test_no_reorg(self):
+        models, public_keys = self.fetch()
+        self.assertEqual(models['model_id'].tolist(), ['model1', 'model2'])
+        self.assertEqual(public_keys['public_key'].tolist(), [b'key2'])
+
+        self.chain.set_block(11, 'a')
+        models, public_keys = self.fetch()
+        self.assertEqual(models['model_id'].tolist(), ['model1', 'model2'])
+        self.assertEqual(public_keys['public_key'].tolist(), [b'key2'])
+
+    def test_reorg(self):
+        self.fetch()
+
+        for block_number in range(7, 12):
+            self.chain.set_block(block_number, 'b')
+        self.chain.set_block(10, 'b', [model_created('model3')])
+
+        models, public_keys = self.fetch()
+        self.assertEqual(models['model_id'].tolist(), ['model1', 'model3'])
+        self.assertEqual(public_keys['public_key'].tolist(), [b'key1'])
+        self.assertEqual(self.event_indexer._last_block_number, 11)
+
+    def test_confirmed_tail_trimmed(self):
+        self.fetch()
+        self.assertEqual(len(self.event_indexer._tail_journal), 2)
+
+        for block_number in range(11, 20):
+            self.chain.set_block(block_number, 'a')
+        self.fetch()
+        self.assertEqual(len(self.event_indexer._tail_journal), 0)
+        self.assertEqual(sorted(self.event_indexer._tail_block_hashes), [19])
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+from ...helpers import (
+    create_web3,
+    create_contract,
+    create_event_indexer,
+    generate_redis_namespace,
+    BaseHardhatTestCase
+)
+
+
+class TestEventIndexerSnapshot(BaseHardhatTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.redis_namespace = generate_redis_namespace()
+
+        w3 = create_web3()
+        contract = create_contract(w3)
+        self.event_indexer = create_event_indexer(
+            w3, contract,
+            redis_namespace=self.redis_namespace,
+        )
+        self.w3 = w3
+
+    def test_ok(self):
+        df = self.event_indexer.fetch_tournaments()
+        self.assertEqual(df['execution_start_at'].iloc[0], 30 * 60)
+
+        w3_recreate = create_web3()
+        event_indexer_recreate = create_event_indexer(
+            w3_recreate, create_contract(w3_recreate),
+            redis_namespace=self.redis_namespace,
+        )
+
+        with patch('src.store.event_indexer.get_events') as mocked_get_events:
+            df = event_indexer_recreate.fetch_tournaments()
+            self.assertEqual(df['execution_start_at'].iloc[0], 30 * 60)
+            mocked_get_events.assert_not_called()
+
+    def test_start_block_number_mismatch(self):
+        self.event_indexer.fetch_tournaments()
+
+        w3_recreate = create_web3()
+        event_indexer_recreate = create_event_indexer(
+            w3_recreate, create_contract(w3_recreate),
+            redis_namespace=self.redis_namespace,
+            start_block_number=2,
+        )
+        self.assertEqual(event_indexer_recreate._last_block_number, 1)
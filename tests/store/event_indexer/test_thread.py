@@ -0,0 +1,104 @@
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from src.store.event_indexer import EventIndexer
+
+
+class TestEventIndexerThread(TestCase):
+    def setUp(self):
+        self.block_number = 3
+        self.events = {
+            2: [('ModelCreated', {'modelId': 'model1', 'tournamentId': 't1', 'owner': 'owner1'})],
+            5: [('ModelCreated', {'modelId': 'model2', 'tournamentId': 't1', 'owner': 'owner1'})],
+        }
+        self.rpc_error = None
+
+        def block_number(_):
+            if self.rpc_error is not None:
+                raise self.rpc_error
+            return self.block_number
+
+        w3 = MagicMock()
+        type(w3.eth).block_number = property(block_number)
+        self.event_indexer = EventIndexer(
+            w3, MagicMock(),
+            get_logs_limit=10,
+            poll_interval_sec=0.01,
+        )
+
+        self.patcher = patch('src.store.event_indexer.get_events')
+        self.mocked_get_events = self.patcher.start()
+        self.mocked_get_events.side_effect = self.get_events
+
+    def tearDown(self):
+        if self.event_indexer._thread is not None:
+            self.event_indexer.terminate_thread()
+        self.patcher.stop()
+
+    def get_events(self, contract, from_block, to_block, event_names):
+        events = []
+        for block_number in range(from_block, to_block + 1):
+            for log_index, (event_name, args) in enumerate(self.events.get(block_number, [])):
+                events.append({
+                    'event': event_name,
+                    'blockNumber': block_number,
+                    'logIndex': log_index,
+                    'blockHash': b'hash',
+                    'args': args,
+                })
+        return events
+
+    def test_wait_for_block(self):
+        self.event_indexer.start_thread()
+        self.assertTrue(self.event_indexer.wait_for_block(3, timeout=5))
+        self.assertEqual(self.event_indexer.fetch_models()['model_id'].tolist(), ['model1'])
+
+        self.block_number = 5
+        self.assertTrue(self.event_indexer.wait_for_block(5, timeout=5))
+        self.assertEqual(self.event_indexer.fetch_models()['model_id'].tolist(), ['model1', 'model2'])
+
+        self.assertFalse(self.event_indexer.wait_for_block(6, timeout=0.1))
+
+    def test_fetch_without_rpc(self):
+        self.event_indexer.start_thread()
+        self.assertTrue(self.event_indexer.wait_for_block(3, timeout=5))
+
+        self.rpc_error = ValueError('rpc error')
+        self.assertEqual(self.event_indexer.fetch_models()['model_id'].tolist(), ['model1'])
+
+    def test_terminate_thread(self):
+        self.event_indexer.start_thread()
+        self.assertTrue(self.event_indexer.wait_for_block(3, timeout=5))
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(self.event_indexer.wait_for_block(6)))
+        waiter.start()
+        self.event_indexer.terminate_thread()
+        waiter.join(timeout=5)
+
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(results, [False])
+        self.assertIsNone(self.event_indexer._thread)
+
+        # スレッドが無くなったのでfetch_*で同期する
+        self.block_number = 5
+        self.assertEqual(self.event_indexer.fetch_models()['model_id'].tolist(), ['model1', 'model2'])
+
+    def test_without_thread(self):
+        self.assertTrue(self.event_indexer.wait_for_block(100))
+        self.assertEqual(self.event_indexer.fetch_models()['model_id'].tolist(), ['model1'])
+
+    def test_revision(self):
+        revision = self.event_indexer.fetch_revision()
+        self.assertEqual(self.event_indexer.fetch_revision(), revision)
+
+        self.block_number = 5
+        self.assertGreater(self.event_indexer.fetch_revision(), revision)
+
+    def test_skip_without_new_block(self):
+        self.event_indexer.fetch_models()
+        call_count = self.mocked_get_events.call_count
+
+        self.event_indexer.fetch_models()
+        self.assertEqual(self.mocked_get_events.call_count, call_count)
+        self.event_indexer._w3.eth.get_block.assert_not_called()
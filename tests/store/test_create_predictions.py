@@ -23,3 +23,31 @@ class TestStoreCreatePredictions(BaseHardhatTestCase):
         store = create_store(w3, contract)
         result = store.create_predictions([])
         self.assertEqual(result, {})
+
+    def test_async(self):
+        w3 = create_web3()
+        contract = create_contract(w3)
+        store = create_store(w3, contract)
+        execution_start_at = get_future_execution_start_at_timestamp()
+        proceed_time(w3, execution_start_at + get_prediction_time_shift())
+
+        # 作成中のモデルの予測は、モデルの確定を待ってから送られる
+        create_models_future = store.create_models_if_not_exist_async([dict(
+            model_id='model1',
+            tournament_id=get_tournament_id(),
+            prediction_license='CC0-1.0',
+        )])
+        create_predictions_future = store.create_predictions_async([dict(
+            model_id='model1',
+            execution_start_at=execution_start_at,
+            content=b'abc',
+        )])
+
+        self.assertEqual(create_models_future.result()['receipt']['status'], 1)
+        self.assertEqual(create_predictions_future.result()['receipt']['status'], 1)
+
+        predictions = store.fetch_predictions(
+            tournament_id=get_tournament_id(),
+            execution_start_at=execution_start_at,
+        )
+        self.assertEqual(predictions[0]['content'], b'abc')
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import Future
+from unittest import TestCase
+from unittest.mock import MagicMock
+from src.logger import create_null_logger
+from src.store.store import Store, _completed_future
+
+
+class TestCreatePredictionsPending(TestCase):
+    def setUp(self):
+        self.store = Store.__new__(Store)
+        self.store._write_lock = threading.Lock()
+        self.store._logger = create_null_logger()
+        self.model_future = Future()
+        self.store._pending_models = {'model1': self.model_future}
+        self.store._create_predictions_async = MagicMock(return_value=_completed_future({'receipt': 'receipt1'}))
+        self.params_list = [
+            {'model_id': 'model1', 'execution_start_at': 1, 'content': b'content1'},
+            {'model_id': 'model2', 'execution_start_at': 1, 'content': b'content2'},
+        ]
+
+    def test_not_blocking(self):
+        future = self.store.create_predictions_async(self.params_list)
+        self.assertFalse(future.done())
+        self.store._create_predictions_async.assert_not_called()
+
+        self.model_future.set_result({})
+        self.assertEqual(future.result(timeout=5), {'receipt': 'receipt1'})
+        self.store._create_predictions_async.assert_called_once_with(self.params_list)
+
+    def test_model_failed(self):
+        future = self.store.create_predictions_async(self.params_list)
+        self.model_future.set_exception(ValueError('model failed'))
+
+        self.assertEqual(future.result(timeout=5), {'receipt': 'receipt1'})
+        self.store._create_predictions_async.assert_called_once_with(self.params_list[1:])
+
+    def test_send_failed(self):
+        self.store._create_predictions_async.side_effect = ValueError('send failed')
+        future = self.store.create_predictions_async(self.params_list)
+        self.model_future.set_result({})
+
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
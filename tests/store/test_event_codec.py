@@ -0,0 +1,56 @@
+from unittest import TestCase
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+from src.store.event_codec import compact_event, encode_events, decode_events
+
+event = AttributeDict({
+    'event': 'PredictionKeySent',
+    'blockNumber': 10,
+    'logIndex': 2,
+    'blockHash': HexBytes(b'\x02' * 32),
+    'transactionHash': HexBytes(b'\x01' * 32),
+    'args': AttributeDict({
+        'owner': '0x5FbDB2315678afecb367f032d93F642f64180aa3',
+        'tournamentId': 'crypto_daily',
+        'executionStartAt': 2000075400,
+        'receiver': '0x5FbDB2315678afecb367f032d93F642f64180aa3',
+        'encryptedContentKey': HexBytes(b'key'),
+    }),
+})
+
+expected = {
+    'event': 'PredictionKeySent',
+    'blockNumber': 10,
+    'logIndex': 2,
+    'args': {
+        'owner': '0x5FbDB2315678afecb367f032d93F642f64180aa3',
+        'tournament_id': 'crypto_daily',
+        'execution_start_at': 2000075400,
+        'receiver': '0x5FbDB2315678afecb367f032d93F642f64180aa3',
+        'encrypted_content_key': b'key',
+    },
+}
+
+
+class TestEventCodec(TestCase):
+    def test_compact_event(self):
+        compacted = compact_event(event)
+        self.assertEqual(compacted, {**expected, 'blockHash': b'\x02' * 32})
+        self.assertIs(type(compacted['args']['encrypted_content_key']), bytes)
+
+    def test_roundtrip(self):
+        for compress in [True, False]:
+            value = encode_events([compact_event(event)] * 3, compress=compress)
+            self.assertEqual(decode_events(value), [expected] * 3)
+
+    def test_empty(self):
+        self.assertEqual(decode_events(encode_events([])), [])
+
+    def test_compress(self):
+        events = [compact_event(event)] * 100
+        self.assertLess(len(encode_events(events)), len(encode_events(events, compress=False)))
+
+    def test_unsupported_version(self):
+        value = encode_events([compact_event(event)])
+        with self.assertRaises(ValueError):
+            decode_events(bytes([255]) + value[1:])
@@ -0,0 +1,176 @@
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from unittest import TestCase
+from src.store.event_table import EventTable
+
+
+class TestEventTable(TestCase):
+    def test_empty(self):
+        table = EventTable(columns=['model_id', 'owner'], unique_keys=['model_id'])
+
+        expected = pd.DataFrame(columns=['model_id', 'owner'])
+        assert_frame_equal(table.to_df(), expected)
+
+    def test_insert_if_not_exist(self):
+        table = EventTable(
+            columns=['model_id', 'execution_start_at', 'encrypted_content'],
+            unique_keys=['model_id', 'execution_start_at'],
+        )
+
+        self.assertTrue(table.insert_if_not_exist(dict(
+            model_id='model1', execution_start_at=1, encrypted_content=b'a')))
+        self.assertTrue(table.insert_if_not_exist(dict(
+            model_id='model1', execution_start_at=2, encrypted_content=b'b')))
+        self.assertFalse(table.insert_if_not_exist(dict(
+            model_id='model1', execution_start_at=1, encrypted_content=b'c')))
+
+        expected = pd.DataFrame([
+            ['model1', 1, b'a'],
+            ['model1', 2, b'b'],
+        ], columns=['model_id', 'execution_start_at', 'encrypted_content'], dtype=object)
+        assert_frame_equal(table.to_df(), expected)
+        self.assertEqual(len(table), 2)
+
+    def test_upsert(self):
+        table = EventTable(columns=['owner', 'public_key'], unique_keys=['owner'])
+
+        table.upsert(dict(owner='owner1', public_key=b'a'))
+        table.upsert(dict(owner='owner2', public_key=b'b'))
+        df_before = table.to_df()
+        table.upsert(dict(owner='owner1', public_key=b'c'))
+
+        expected = pd.DataFrame([
+            ['owner1', b'c'],
+            ['owner2', b'b'],
+        ], columns=['owner', 'public_key'], dtype=object)
+        assert_frame_equal(table.to_df(), expected)
+        self.assertEqual(df_before['public_key'].iloc[0], b'a')
+
+    def test_get(self):
+        table = EventTable(
+            columns=['owner', 'execution_start_at', 'content_key'],
+            unique_keys=['owner', 'execution_start_at'],
+        )
+        table.insert_if_not_exist(dict(owner='owner1', execution_start_at=1, content_key=b'a'))
+
+        self.assertEqual(table.get(('owner1', 1)), dict(owner='owner1', execution_start_at=1, content_key=b'a'))
+        self.assertIsNone(table.get(('owner1', 2)))
+
+        table.remove_last()
+        self.assertIsNone(table.get(('owner1', 1)))
+
+    def test_unknown_column(self):
+        table = EventTable(columns=['model_id'], unique_keys=['model_id'])
+
+        table.insert_if_not_exist(dict(model_id='model1'))
+        table.insert_if_not_exist(dict(model_id='model2', prediction_license='CC0-1.0'))
+
+        expected = pd.DataFrame([
+            ['model1', None],
+            ['model2', 'CC0-1.0'],
+        ], columns=['model_id', 'prediction_license'], dtype=object)
+        assert_frame_equal(table.to_df(), expected)
+
+    def test_fetch(self):
+        table = EventTable(
+            columns=['model_id', 'tournament_id', 'owner'],
+            unique_keys=['model_id'],
+            index_columns=['tournament_id', 'owner'],
+        )
+        table.insert_if_not_exist(dict(model_id='model1', tournament_id='t1', owner='owner1'))
+        table.insert_if_not_exist(dict(model_id='model2', tournament_id='t2', owner='owner1'))
+        table.insert_if_not_exist(dict(model_id='model3', tournament_id='t1', owner='owner2'))
+
+        df = table.fetch([('tournament_id', 't1'), ('owner', None)])
+        self.assertEqual(df['model_id'].tolist(), ['model1', 'model3'])
+        self.assertEqual(df.index.tolist(), [0, 2])
+
+        df = table.fetch([('tournament_id', 't1'), ('owner', 'owner2')])
+        self.assertEqual(df['model_id'].tolist(), ['model3'])
+
+        # not indexed column
+        df = table.fetch([('model_id', 'model2')])
+        self.assertEqual(df['model_id'].tolist(), ['model2'])
+
+        df = table.fetch([('tournament_id', 'not_found')])
+        self.assertEqual(df.shape, (0, 3))
+
+        assert_frame_equal(table.fetch([('owner', None)]), table.to_df())
+
+    def test_fetch_same_as_to_df(self):
+        table = EventTable(
+            columns=['model_id', 'tournament_id', 'owner'],
+            unique_keys=['model_id'],
+            index_columns=['tournament_id'],
+        )
+        table.insert_if_not_exist(dict(model_id='model1', tournament_id='t1', owner='owner1'))
+        table.insert_if_not_exist(dict(model_id='model2', tournament_id='t2', owner='owner1'))
+        table.insert_if_not_exist(dict(model_id='model3', tournament_id='t1', owner='owner2'))
+
+        for conditions, rows in [
+            ([('tournament_id', 't1')], [0, 2]),
+            ([('owner', 'owner1')], [0, 1]),
+            ([('tournament_id', 'not_found')], []),
+        ]:
+            assert_frame_equal(table.fetch(conditions), table.to_df().iloc[rows])
+
+    def test_fetch_without_copy(self):
+        table = EventTable(columns=['owner', 'public_key'], unique_keys=['owner'])
+        table.upsert(dict(owner='owner1', public_key=b'a'))
+
+        self.assertIs(table.fetch([], copy=False), table.to_df())
+        self.assertIsNot(table.fetch([]), table.to_df())
+
+    def test_upsert_reindex(self):
+        table = EventTable(
+            columns=['owner', 'public_key'],
+            unique_keys=['owner'],
+            index_columns=['public_key'],
+        )
+        table.upsert(dict(owner='owner1', public_key=b'a'))
+        table.upsert(dict(owner='owner2', public_key=b'a'))
+        table.upsert(dict(owner='owner1', public_key=b'b'))
+
+        self.assertEqual(table.fetch([('public_key', b'a')])['owner'].tolist(), ['owner2'])
+        self.assertEqual(table.fetch([('public_key', b'b')])['owner'].tolist(), ['owner1'])
+
+    def test_snapshot(self):
+        table = EventTable(
+            columns=['model_id', 'owner'],
+            unique_keys=['model_id'],
+            index_columns=['owner'],
+        )
+        table.insert_if_not_exist(dict(model_id='model1', owner='owner1'))
+        table.insert_if_not_exist(dict(model_id='model2', owner='owner2', prediction_license='CC0-1.0'))
+
+        restored = EventTable(
+            columns=['model_id', 'owner'],
+            unique_keys=['model_id'],
+            index_columns=['owner'],
+        )
+        restored.load_snapshot(table.to_snapshot())
+
+        assert_frame_equal(restored.to_df(), table.to_df())
+        self.assertEqual(restored.fetch([('owner', 'owner2')])['model_id'].tolist(), ['model2'])
+        self.assertFalse(restored.insert_if_not_exist(dict(model_id='model1', owner='owner3')))
+
+    def test_rollback(self):
+        table = EventTable(
+            columns=['owner', 'public_key'],
+            unique_keys=['owner'],
+            index_columns=['public_key'],
+        )
+        table.upsert(dict(owner='owner1', public_key=b'a'))
+        expected = table.to_df().copy()
+
+        self.assertIsNone(table.upsert(dict(owner='owner2', public_key=b'b')))
+        previous_row = table.upsert(dict(owner='owner1', public_key=b'c'))
+        self.assertEqual(previous_row, dict(owner='owner1', public_key=b'a'))
+
+        table.upsert(previous_row)
+        table.remove_last()
+
+        assert_frame_equal(table.to_df(), expected)
+        self.assertEqual(table.fetch([('public_key', b'b')]).shape[0], 0)
+        self.assertEqual(table.fetch([('public_key', b'a')])['owner'].tolist(), ['owner1'])
+        self.assertTrue(table.insert_if_not_exist(dict(owner='owner2', public_key=b'b')))
@@ -1,3 +1,4 @@
+import threading
 from unittest import TestCase
 from unittest.mock import patch
 from ..helpers import (
@@ -16,6 +17,7 @@ from ..helpers import (
 )
 from src.web3 import get_account_address
 from src.store.event_indexer import EventIndexer
+from src.web3.transaction_manager import TransactionManager
 
 execution_start_at = get_future_execution_start_at_timestamp()
 content = 'abc'.encode()
@@ -178,3 +180,111 @@ class TestStoreFetchPredictions(BaseHardhatTestCase):
             'execution_start_at': execution_start_at,
             'content': content,
         }])
+
+    def test_not_blocked_by_transaction(self):
+        store = self.store
+        transact_started = threading.Event()
+        transact_released = threading.Event()
+
+        def blocking_transact(*args, **kwargs):
+            transact_started.set()
+            transact_released.wait()
+            raise Exception('transact canceled')
+
+        def create_predictions():
+            try:
+                store.create_predictions([dict(
+                    model_id=model_id,
+                    execution_start_at=execution_start_at + 24 * 60 * 60,
+                    content=content,
+                )])
+            except Exception:
+                pass
+
+        with patch.object(TransactionManager, 'send', side_effect=blocking_transact):
+            thread = threading.Thread(target=create_predictions)
+            thread.start()
+            self.assertTrue(transact_started.wait(timeout=10))
+
+            # 書き込みのトランザクション待ちの間も読める
+            predictions = store.fetch_predictions(
+                tournament_id=get_tournament_id(),
+                execution_start_at=execution_start_at
+            )
+
+            transact_released.set()
+            thread.join()
+
+        self.assertEqual(predictions, [{
+            **predictions[0],
+            'model_id': model_id,
+            'execution_start_at': execution_start_at,
+            'content': content,
+        }])
+
+    def test_content_cache(self):
+        store = self.store_purchaser
+
+        proceed_time(self.w3, execution_start_at + get_sending_time_shift())
+        self.store.send_prediction_keys(
+            get_tournament_id(),
+            execution_start_at,
+            [store.default_account_address()]
+        )
+
+        store.fetch_predictions(
+            tournament_id=get_tournament_id(),
+            execution_start_at=execution_start_at
+        )
+
+        with patch('src.store.store.SecretBox') as mocked_secret_box, \
+                patch('src.store.store.SealedBox') as mocked_sealed_box:
+            predictions = store.fetch_predictions(
+                tournament_id=get_tournament_id(),
+                execution_start_at=execution_start_at
+            )
+            mocked_secret_box.assert_not_called()
+            mocked_sealed_box.assert_not_called()
+
+        self.assertEqual(predictions[0]['content'], content)
+
+    def test_fetch_predictions_range(self):
+        store = self.store
+
+        df = store.fetch_predictions_range(
+            tournament_id=get_tournament_id(),
+            execution_start_ats=[execution_start_at - 24 * 60 * 60, execution_start_at],
+        )
+
+        self.assertEqual(df['model_id'].tolist(), [model_id])
+        self.assertEqual(df['execution_start_at'].tolist(), [execution_start_at])
+        self.assertEqual(df['content'].tolist(), [content])
+        self.assertEqual(df.to_dict('records'), store.fetch_predictions(
+            tournament_id=get_tournament_id(),
+            execution_start_at=execution_start_at,
+        ))
+
+    def test_decrypt_concurrency(self):
+        self.store.create_models_if_not_exist([dict(
+            model_id='model2',
+            tournament_id=get_tournament_id(),
+            prediction_license='CC0-1.0',
+        )])
+        self.store.create_predictions([dict(
+            model_id='model2',
+            execution_start_at=execution_start_at,
+            content=b'def',
+        )])
+        proceed_time(self.w3, execution_start_at + get_publication_time_shift())
+        self.store.publish_prediction_key(get_tournament_id(), execution_start_at)
+
+        w3 = create_web3(account_index=1)
+        contract = create_contract(w3)
+        store = create_store(w3, contract, decrypt_concurrency=4)
+
+        df = store.fetch_predictions_range(
+            tournament_id=get_tournament_id(),
+            execution_start_ats=[execution_start_at],
+        )
+        self.assertEqual(df['model_id'].tolist(), [model_id, 'model2'])
+        self.assertEqual(df['content'].tolist(), [content, b'def'])
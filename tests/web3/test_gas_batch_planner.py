@@ -0,0 +1,55 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+from src.web3.gas_batch_planner import GasBatchPlanner
+
+
+def create_func(items):
+    func = MagicMock()
+    if any(item.get('invalid') for item in items):
+        func.estimateGas.side_effect = ValueError('execution reverted')
+    else:
+        func.estimateGas.return_value = 21000 + sum(len(item['payload']) * 100 for item in items)
+    return func
+
+
+class TestGasBatchPlanner(TestCase):
+    def test_split(self):
+        planner = GasBatchPlanner(gas_budget=21000 + 3 * 10000)
+        items = [{'payload': b'x' * 100} for _ in range(7)]
+
+        chunks, failures = planner.plan('test', items, create_func, lambda x: len(x['payload']), {})
+
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(failures, [])
+
+    def test_large_item(self):
+        planner = GasBatchPlanner(gas_budget=21000 + 10000)
+        items = [{'payload': b'x' * 1000}, {'payload': b'x' * 10}]
+
+        chunks, failures = planner.plan('test', items, create_func, lambda x: len(x['payload']), {})
+
+        self.assertEqual(chunks, [[items[0]], [items[1]]])
+
+    def test_cache(self):
+        planner = GasBatchPlanner()
+        estimated = []
+
+        def counting_create_func(items):
+            estimated.append(items)
+            return create_func(items)
+
+        items = [{'payload': b'x' * 100}, {'payload': b'y' * 100}, {'payload': b'z' * 1000}]
+        planner.plan('test', items, counting_create_func, lambda x: len(x['payload']), {})
+        planner.plan('test', items, counting_create_func, lambda x: len(x['payload']), {})
+
+        self.assertEqual(estimated, [[items[0]], [items[2]]])
+
+    def test_estimate_error(self):
+        planner = GasBatchPlanner()
+        items = [{'payload': b'x'}, {'payload': b'x' * 1000, 'invalid': True}]
+
+        chunks, failures = planner.plan('test', items, create_func, lambda x: len(x['payload']), {})
+
+        self.assertEqual(chunks, [[items[0]]])
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]['item'], items[1])
@@ -1,5 +1,9 @@
 from unittest import TestCase
 from unittest.mock import MagicMock
+from eth_abi import encode_abi
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
 from ..helpers import (
     create_web3,
     create_contract,
@@ -23,3 +27,85 @@ class TestWeb3GetEvents(BaseHardhatTestCase):
             **events[0]['args'],
             'executionStartAt': 30 * 60
         })
+
+    def test_event_names(self):
+        w3 = create_web3()
+        contract = create_contract(w3)
+
+        events = get_events(
+            contract=contract,
+            from_block=1,
+            to_block=w3.eth.block_number,
+            event_names=['PublicKeyChanged'],
+        )
+        self.assertEqual(events, [])
+
+
+abi = [
+    {
+        'anonymous': False,
+        'inputs': [
+            {'indexed': False, 'internalType': 'string', 'name': 'modelId', 'type': 'string'},
+            {'indexed': False, 'internalType': 'uint256', 'name': 'executionStartAt', 'type': 'uint256'},
+            {'indexed': False, 'internalType': 'bytes', 'name': 'encryptedContent', 'type': 'bytes'},
+        ],
+        'name': 'PredictionCreated',
+        'type': 'event',
+    },
+    {
+        'anonymous': False,
+        'inputs': [
+            {'indexed': False, 'internalType': 'address', 'name': 'owner', 'type': 'address'},
+            {'indexed': False, 'internalType': 'bytes', 'name': 'publicKey', 'type': 'bytes'},
+        ],
+        'name': 'PublicKeyChanged',
+        'type': 'event',
+    },
+]
+contract_address = '0x5FbDB2315678afecb367f032d93F642f64180aa3'
+
+
+def create_log(event_name, types, values, block_number, log_index):
+    event_abi = [x for x in abi if x['name'] == event_name][0]
+    return {
+        'address': contract_address,
+        'topics': [HexBytes(event_abi_to_log_topic(event_abi))],
+        'data': Web3.toHex(encode_abi(types, values)),
+        'blockNumber': block_number,
+        'logIndex': log_index,
+        'transactionIndex': 0,
+        'transactionHash': HexBytes(b'\x00' * 32),
+        'blockHash': HexBytes(b'\x00' * 32),
+    }
+
+
+class TestWeb3GetEventsDecode(TestCase):
+    def setUp(self):
+        w3 = Web3()
+        self.contract = w3.eth.contract(address=contract_address, abi=abi)
+        self.w3 = MagicMock()
+        self.w3.codec = w3.codec
+        self.contract.web3 = self.w3
+
+    def test_ok(self):
+        self.w3.eth.get_logs.return_value = [
+            create_log('PublicKeyChanged', ['address', 'bytes'], [contract_address, b'key'], 2, 0),
+            create_log('PredictionCreated', ['string', 'uint256', 'bytes'], ['model1', 3, b'abc'], 1, 1),
+            {**create_log('PredictionCreated', ['string', 'uint256', 'bytes'], ['model1', 3, b'abc'], 1, 0),
+             'topics': [HexBytes(b'\x01' * 32)]},
+        ]
+
+        events = get_events(self.contract, from_block=1, to_block=2)
+
+        self.assertEqual([x['event'] for x in events], ['PredictionCreated', 'PublicKeyChanged'])
+        self.assertEqual(events[0]['args']['modelId'], 'model1')
+        self.assertEqual(events[1]['args']['publicKey'], b'key')
+        self.assertEqual(self.w3.eth.get_logs.call_args[0][0]['topics'], [])
+
+    def test_event_names(self):
+        self.w3.eth.get_logs.return_value = []
+
+        get_events(self.contract, from_block=1, to_block=2, event_names=['PublicKeyChanged'])
+
+        topic = Web3.toHex(event_abi_to_log_topic(abi[1]))
+        self.assertEqual(self.w3.eth.get_logs.call_args[0][0]['topics'], [[topic]])
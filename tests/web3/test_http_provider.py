@@ -0,0 +1,72 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock
+from src.web3.http_provider import PooledHTTPProvider
+
+
+def create_response(body):
+    response = MagicMock()
+    response.json.return_value = body
+    response.content = json.dumps(body).encode()
+    return response
+
+
+class TestPooledHTTPProvider(TestCase):
+    def setUp(self):
+        self.provider = PooledHTTPProvider('http://localhost:8545', pool_maxsize=3)
+        self.provider._session.post = MagicMock()
+
+    def test_pool(self):
+        adapter = self.provider._session.get_adapter('http://localhost:8545')
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_cache_immutable(self):
+        self.provider._session.post.return_value = create_response(
+            {'jsonrpc': '2.0', 'id': 0, 'result': '0x7a69'})
+
+        self.assertEqual(self.provider.make_request('eth_chainId', [])['result'], '0x7a69')
+        self.assertEqual(self.provider.make_request('eth_chainId', [])['result'], '0x7a69')
+        self.assertEqual(self.provider._session.post.call_count, 1)
+
+        self.provider.make_request('eth_blockNumber', [])
+        self.provider.make_request('eth_blockNumber', [])
+        self.assertEqual(self.provider._session.post.call_count, 3)
+
+    def test_not_cache_null(self):
+        self.provider._session.post.return_value = create_response(
+            {'jsonrpc': '2.0', 'id': 0, 'result': None})
+
+        self.provider.make_request('eth_getBlockByHash', ['0x1', False])
+        self.provider.make_request('eth_getBlockByHash', ['0x1', False])
+        self.assertEqual(self.provider._session.post.call_count, 2)
+
+    def test_batch_request(self):
+        def post(uri, data, **kwargs):
+            body = json.loads(data)
+            return create_response([
+                {'jsonrpc': '2.0', 'id': x['id'], 'result': x['method']}
+                for x in reversed(body)
+            ])
+        self.provider._session.post.side_effect = post
+
+        results = self.provider.make_batch_request([
+            ('eth_chainId', []),
+            ('eth_blockNumber', []),
+        ])
+        self.assertEqual(results, ['eth_chainId', 'eth_blockNumber'])
+        self.assertEqual(self.provider._session.post.call_count, 1)
+
+    def test_batch_request_error(self):
+        self.provider._session.post.return_value = create_response([
+            {'jsonrpc': '2.0', 'id': 0, 'error': {'code': -32000, 'message': 'error'}},
+        ])
+
+        with self.assertRaises(ValueError):
+            self.provider.make_batch_request([('eth_chainId', [])])
+
+    def test_batch_request_not_supported(self):
+        self.provider._session.post.return_value = create_response(
+            {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'batch not supported'}})
+
+        with self.assertRaises(ValueError):
+            self.provider.make_batch_request([('eth_chainId', [])])
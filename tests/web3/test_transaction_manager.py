@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import MagicMock
+from src.web3.transaction_manager import TransactionManager
+
+
+def create_w3():
+    w3 = MagicMock()
+    w3.eth.default_account = SimpleNamespace(address='0x1', key=b'key')
+    w3.provider = SimpleNamespace()
+    w3.eth.get_transaction_count.return_value = 5
+    w3.eth.max_priority_fee = 10
+    w3.eth.get_block.return_value = {'baseFeePerGas': 100}
+    w3.eth.block_number = 1
+    w3.eth.wait_for_transaction_receipt.return_value = {'status': 1, 'blockNumber': 1}
+    w3.eth.account.sign_transaction.side_effect = lambda tx, private_key: SimpleNamespace(
+        rawTransaction=tx,
+        hash='hash{}'.format(tx['nonce']).encode(),
+    )
+    return w3
+
+
+def create_func():
+    func = MagicMock()
+    func.estimateGas.return_value = 1000
+    func.buildTransaction.side_effect = lambda options: dict(options)
+    return func
+
+
+class TestTransactionManager(TestCase):
+    def test_local_nonce(self):
+        w3 = create_w3()
+        transaction_manager = TransactionManager(w3, gas_buffer=100, max_priority_fee_scale=2)
+
+        tx_hashes = [transaction_manager.send(create_func(), {'from': '0x1'}) for _ in range(3)]
+
+        self.assertEqual(tx_hashes, [b'hash5', b'hash6', b'hash7'])
+        w3.eth.get_transaction_count.assert_called_once_with('0x1', 'pending')
+        w3.eth.get_block.assert_called_once_with('latest')
+
+        tx = w3.eth.send_raw_transaction.call_args[0][0]
+        self.assertEqual(tx, {
+            'from': '0x1',
+            'nonce': 7,
+            'maxFeePerGas': 220,
+            'maxPriorityFeePerGas': 20,
+            'gas': 1100,
+        })
+
+    def test_batch_prefetch(self):
+        w3 = create_w3()
+        w3.provider = SimpleNamespace(make_batch_request=MagicMock(return_value=[
+            '0x5', '0xa', {'baseFeePerGas': '0x64'},
+        ]))
+        transaction_manager = TransactionManager(w3, max_priority_fee_scale=2)
+
+        tx_hashes = [transaction_manager.send(create_func(), {'from': '0x1'}) for _ in range(2)]
+
+        self.assertEqual(tx_hashes, [b'hash5', b'hash6'])
+        w3.provider.make_batch_request.assert_called_once_with([
+            ('eth_getTransactionCount', ['0x1', 'pending']),
+            ('eth_maxPriorityFeePerGas', []),
+            ('eth_getBlockByNumber', ['latest', False]),
+        ])
+        w3.eth.get_transaction_count.assert_not_called()
+        w3.eth.get_block.assert_not_called()
+
+        tx = w3.eth.send_raw_transaction.call_args[0][0]
+        self.assertEqual(tx['maxFeePerGas'], 220)
+        self.assertEqual(tx['maxPriorityFeePerGas'], 20)
+
+    def test_batch_prefetch_error(self):
+        w3 = create_w3()
+        w3.provider = SimpleNamespace(make_batch_request=MagicMock(
+            side_effect=ValueError('batch request not supported')))
+        transaction_manager = TransactionManager(w3, max_priority_fee_scale=2)
+
+        tx_hashes = [transaction_manager.send(create_func(), {'from': '0x1'}) for _ in range(2)]
+
+        self.assertEqual(tx_hashes, [b'hash5', b'hash6'])
+        w3.provider.make_batch_request.assert_called_once()
+        w3.eth.get_transaction_count.assert_called_once_with('0x1', 'pending')
+
+        tx = w3.eth.send_raw_transaction.call_args[0][0]
+        self.assertEqual(tx['maxFeePerGas'], 220)
+
+    def test_build_once(self):
+        w3 = create_w3()
+        func = create_func()
+        transaction_manager = TransactionManager(w3, gas_buffer=100)
+
+        receipt = transaction_manager.transact(func, {'from': '0x1'})
+
+        self.assertEqual(receipt, {'status': 1, 'blockNumber': 1})
+        func.buildTransaction.assert_called_once()
+        func.estimateGas.assert_called_once()
+
+    def test_send_error(self):
+        w3 = create_w3()
+        transaction_manager = TransactionManager(w3)
+
+        w3.eth.send_raw_transaction.side_effect = ValueError('nonce too low')
+        with self.assertRaises(ValueError):
+            transaction_manager.send(create_func(), {'from': '0x1'})
+
+        w3.eth.send_raw_transaction.side_effect = None
+        w3.eth.get_transaction_count.return_value = 8
+        tx_hash = transaction_manager.send(create_func(), {'from': '0x1'})
+        self.assertEqual(tx_hash, b'hash8')
+
+    def test_failed(self):
+        w3 = create_w3()
+        w3.eth.wait_for_transaction_receipt.return_value = {'status': 0, 'blockNumber': 1}
+        transaction_manager = TransactionManager(w3)
+
+        with self.assertRaisesRegex(Exception, 'transaction failed'):
+            transaction_manager.transact(create_func(), {'from': '0x1'})
+
+    def test_remote_private_key(self):
+        w3 = create_w3()
+        w3.eth.default_account = '0x1'
+        func = create_func()
+        func.transact.return_value = b'hash'
+        transaction_manager = TransactionManager(w3)
+
+        self.assertEqual(transaction_manager.send(func, {'from': '0x1'}), b'hash')
+        w3.eth.get_transaction_count.assert_not_called()